@@ -0,0 +1,187 @@
+import ast
+import math
+import os
+from datetime import datetime, timezone
+from typing import List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+TIMESTAMP = pa.timestamp("ms", tz="UTC")  # Parquet has no second unit
+
+# Rows written by `process_repo` and filled by `update_dataframe` (the README's first two tables).
+ROW_SCHEMA = pa.schema([
+    ("repo_name", pa.string()),
+    ("base_commit_ids", pa.list_(pa.string())),
+    ("base_commit_dates", pa.list_(TIMESTAMP)),
+    ("resolving_commit_id", pa.string()),
+    ("resolving_commit_date", TIMESTAMP),
+    ("pr_num", pa.int32()),
+    ("pr_close_date", TIMESTAMP),
+    ("pr_open_date", TIMESTAMP),
+    ("num_changed_files", pa.list_(pa.int32())),
+    ("changed_files_list", pa.list_(pa.list_(pa.string()))),
+    ("linked_issue_nums", pa.list_(pa.int32())),
+    ("_linked_issue_desc", pa.string()),
+    ("_pr_description", pa.string()),
+    ("linked_issue_date_open", pa.list_(TIMESTAMP)),
+    ("linked_issue_date_closed", pa.list_(TIMESTAMP)),
+])
+
+# Rows after `explode_base_commits`, one per (base commit, resolving commit) pair.
+EXPLODED_SCHEMA = pa.schema([
+    ("repo_name", pa.string()),
+    ("resolving_commit_id", pa.string()),
+    ("resolving_commit_date", TIMESTAMP),
+    ("pr_num", pa.int32()),
+    ("pr_close_date", TIMESTAMP),
+    ("pr_open_date", TIMESTAMP),
+    ("num_changed_files", pa.int32()),
+    ("changed_files_list", pa.list_(pa.string())),
+    ("linked_issue_nums", pa.list_(pa.int32())),
+    ("_linked_issue_desc", pa.string()),
+    ("_pr_description", pa.string()),
+    ("linked_issue_date_open", pa.list_(TIMESTAMP)),
+    ("linked_issue_date_closed", pa.list_(TIMESTAMP)),
+    ("base_commit", pa.string()),
+    ("base_commit_date", TIMESTAMP),
+])
+
+
+def _is_missing(value) -> bool:
+    return value is None or value is pd.NaT or (isinstance(value, float) and math.isnan(value))
+
+
+def to_timestamp(value) -> Optional[datetime]:
+    """
+    Parses a git (`2025-03-22 12:15:07 +0900`) or GitHub (`2025-03-22T17:00:42Z`) date.
+
+    Args:
+        value: A date string, datetime or missing value.
+
+    Returns:
+        Optional[datetime]: The date in UTC, or None for missing values and placeholders
+            such as "Unknown" or "Fetch failed".
+    """
+    if _is_missing(value):
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).strip())
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _to_int(value) -> Optional[int]:
+    if _is_missing(value):
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_str(value) -> Optional[str]:
+    return None if _is_missing(value) else str(value)
+
+
+def _to_list(value) -> Optional[list]:
+    if _is_missing(value):
+        return None
+    if isinstance(value, str):
+        value = ast.literal_eval(value) if value.strip() else []
+    return list(value)
+
+
+def _converter(data_type: pa.DataType):
+    if pa.types.is_list(data_type):
+        convert_item = _converter(data_type.value_type)
+
+        def convert(value):
+            items = _to_list(value)
+            return None if items is None else [convert_item(item) for item in items]
+        return convert
+    if pa.types.is_timestamp(data_type):
+        return to_timestamp
+    if pa.types.is_integer(data_type):
+        return _to_int
+    return _to_str
+
+
+def to_table(df: pd.DataFrame, schema: pa.Schema = ROW_SCHEMA) -> pa.Table:
+    """
+    Converts scraper rows to a typed Arrow table.
+
+    Cells may hold native lists or their `str(list)` form as read back from CSV;
+    each is parsed once here, so readers of the Parquet output never parse again.
+    Schema columns missing from `df` become nulls; extra columns keep an inferred type.
+
+    Args:
+        df (pd.DataFrame): The rows.
+        schema (pa.Schema, optional): ROW_SCHEMA or EXPLODED_SCHEMA. Defaults to ROW_SCHEMA.
+
+    Returns:
+        pa.Table: The typed table.
+    """
+    arrays, fields = [], []
+    for field in schema:
+        if field.name in df.columns:
+            convert = _converter(field.type)
+            values = [convert(value) for value in df[field.name].tolist()]
+        else:
+            values = [None] * len(df)
+        arrays.append(pa.array(values, type=field.type))
+        fields.append(field)
+    for column in df.columns:
+        if column not in schema.names:
+            array = pa.array(df[column], from_pandas=True)
+            arrays.append(array)
+            fields.append(pa.field(column, array.type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def write_parquet(table: pa.Table, filename: str) -> None:
+    """Writes a table to a Parquet file; the file is replaced atomically."""
+    temp_filename = os.path.join(os.path.dirname(os.path.abspath(filename)), f".{os.path.basename(filename)}.tmp")
+    pq.write_table(table, temp_filename)
+    os.replace(temp_filename, filename)
+
+
+def read_table(path: Union[str, List[str]], columns: Optional[List[str]] = None) -> pa.Table:
+    """
+    Memory-maps a Parquet file (or a directory of parts) as an Arrow table, without parsing any cell.
+
+    Args:
+        path (Union[str, List[str]]): The Parquet file, a directory or a list of files.
+        columns (Optional[List[str]], optional): Columns to load. Defaults to all.
+
+    Returns:
+        pa.Table: The table.
+    """
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+
+def read_dataframe(path: Union[str, List[str]], columns: Optional[List[str]] = None, arrow_dtypes: bool = False) -> pd.DataFrame:
+    """
+    Loads typed Parquet output as a DataFrame.
+
+    List columns arrive as arrays and dates as UTC timestamps, so no
+    `ast.literal_eval`/`json.loads` pass is needed.
+
+    Args:
+        path (Union[str, List[str]]): The Parquet file, a directory or a list of files.
+        columns (Optional[List[str]], optional): Columns to load. Defaults to all.
+        arrow_dtypes (bool, optional): Keep the Arrow buffers (`pd.ArrowDtype` columns) instead of
+            converting to NumPy/object columns. Defaults to False.
+
+    Returns:
+        pd.DataFrame: The rows.
+    """
+    table = read_table(path, columns)
+    return table.to_pandas(types_mapper=pd.ArrowDtype) if arrow_dtypes else table.to_pandas()
@@ -0,0 +1,130 @@
+"""
+History walks of the merge scan with and without a commit-graph (plus changed-path Bloom filters).
+
+    python benchmarks/bench_commit_graph.py --commits 100000
+    python benchmarks/bench_commit_graph.py --repo path/to/clone   # an existing clone, graph removed first
+
+A synthetic history is generated with `git fast-import` into a temporary bare
+repository: a mainline where every fourth commit merges a one-commit side branch,
+touching files spread over 200 directories.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from commit_graph import write_commit_graph  # noqa: E402
+
+# Same format as scraper_v03.MERGE_LOG_FORMAT
+MERGE_LOG_FORMAT = '%H%x1f%P%x1f%T%x1f%ci%x1f%B%x1e'
+START = 1420070400  # 2015-01-01
+
+
+def _commit(ref: str, mark: int, timestamp: int, message: str, parents, path: str, content: str) -> str:
+    lines = [f"commit {ref}", f"mark :{mark}", f"committer Bench <bench@example.com> {timestamp} +0000",
+             f"data {len(message)}", message]
+    lines += [f"{'from' if i == 0 else 'merge'} :{parent}" for i, parent in enumerate(parents)]
+    lines += [f"M 100644 inline {path}", f"data {len(content)}", content, ""]
+    return "\n".join(lines) + "\n"
+
+
+def make_history(repo_path: str, commits: int) -> None:
+    subprocess.run(["git", "init", "--quiet", "--bare", repo_path], check=True)
+    process = subprocess.Popen(["git", "-C", repo_path, "fast-import", "--quiet"], stdin=subprocess.PIPE, text=True)
+    mark, main = 0, None
+    for i in range(commits):
+        mark += 1
+        timestamp = START + i * 600
+        path = f"dir{i % 200}/file{i % 7}.txt"
+        if i % 4 == 3 and main is not None:
+            process.stdin.write(_commit("refs/heads/side", mark, timestamp, f"side {i}", [main], path, f"side {i}\n"))
+            side, mark = mark, mark + 1
+            process.stdin.write(_commit("refs/heads/main", mark, timestamp + 1, f"Merge pull request #{i} from x/side",
+                                        [main, side], path, f"side {i}\n"))
+        else:
+            process.stdin.write(_commit("refs/heads/main", mark, timestamp, f"commit {i}", [main] if main else [],
+                                        path, f"{i}\n"))
+        main = mark
+    process.stdin.close()
+    if process.wait() != 0:
+        raise RuntimeError("git fast-import failed")
+    subprocess.run(["git", "-C", repo_path, "symbolic-ref", "HEAD", "refs/heads/main"], check=True)
+
+
+def git(repo_path: str, *args: str, stdin: str = None) -> str:
+    return subprocess.run(["git", "-C", repo_path] + list(args), input=stdin, capture_output=True, text=True, check=True).stdout
+
+
+def queries(repo_path: str):
+    """The scan's git queries, as (label, callable) pairs."""
+    revs = git(repo_path, "rev-list", "--first-parent", "HEAD").split()
+    merges = git(repo_path, "rev-list", "--merges", "-n", "200", "HEAD").split()
+    recent = git(repo_path, "log", "-1", "--format=%ci", revs[len(revs) // 10]).strip()
+    last = revs[len(revs) // 20]
+    return [
+        ("log --merges (full history)", lambda: git(repo_path, "log", "--merges", f"--pretty=format:{MERGE_LOG_FORMAT}")),
+        ("log --merges --since (last 10%)",
+         lambda: git(repo_path, "log", "--merges", f"--since={recent}", f"--pretty=format:{MERGE_LOG_FORMAT}")),
+        ("log --merges last..head (5%)", lambda: git(repo_path, "log", "--merges", f"--pretty=format:{MERGE_LOG_FORMAT}",
+                                                      f"{last}..HEAD")),
+        ("rev-list --parents -n 1 (x200)", lambda: [git(repo_path, "rev-list", "--parents", "-n", "1", m) for m in merges]),
+        ("diff-tree --stdin (200 merges)", lambda: git(repo_path, "diff-tree", "--stdin", "-r", "-M", "--name-only",
+                                                        stdin="".join(f"{m} {m}^1\n" for m in merges))),
+        ("log -- <path> (Bloom filters)", lambda: git(repo_path, "log", "--format=%H", "--", "dir7/file0.txt")),
+    ]
+
+
+def timed(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--commits", type=int, default=100000)
+    parser.add_argument("--repo", help="Benchmark a copy of this repository instead of a synthetic history")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_commit_graph_")
+    repo_path = os.path.join(workdir, "repo.git")
+    try:
+        started = time.perf_counter()
+        if args.repo:
+            subprocess.run(["git", "clone", "--quiet", "--bare", "--no-local", args.repo, repo_path], check=True)
+        else:
+            make_history(repo_path, args.commits)
+        print(f"history: {git(repo_path, 'rev-list', '--count', '--all').strip()} commits "
+              f"({time.perf_counter() - started:.1f}s to create)")
+        for name in ("objects/info/commit-graph", "objects/info/commit-graphs"):
+            path = os.path.join(repo_path, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+
+        checks = queries(repo_path)
+        before = [timed(func, args.repeat) for _, func in checks]
+        started = time.perf_counter()
+        write_commit_graph(repo_path)
+        print(f"commit-graph write --reachable --changed-paths: {time.perf_counter() - started:.1f}s")
+        after = [timed(func, args.repeat) for _, func in checks]
+
+        print(f"{'query':<36} {'without':>9} {'with':>9} {'speedup':>8}")
+        for (label, _), old, new in zip(checks, before, after):
+            print(f"{label:<36} {old:8.3f}s {new:8.3f}s {old / new:7.1f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
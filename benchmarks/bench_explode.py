@@ -0,0 +1,123 @@
+"""
+Benchmark of the vectorized explode against the row-loop implementations it replaced.
+
+    python benchmarks/bench_explode.py --rows 100000
+
+Both legacy versions are copied here verbatim (minus comments) so the numbers stay
+comparable after the library code changes.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from explode import explode_groups  # noqa: E402
+
+GROUP1 = ['base_commit_ids', 'base_commit_dates', 'num_changed_files', 'changed_files_list']
+GROUP2 = ['linked_issue_nums', 'linked_issue_date_open', 'linked_issue_date_closed']
+
+
+def legacy_explode_base_commits(df: pd.DataFrame) -> pd.DataFrame:
+    rows = []
+    for _, row in df.iterrows():
+        base_commits = row['base_commit_ids']
+        base_dates = row['base_commit_dates']
+        num_files = row['num_changed_files']
+        files_list = row['changed_files_list']
+
+        for i in range(len(base_commits)):
+            new_row = row.copy()
+            new_row['base_commit'] = base_commits[i]
+            new_row['base_commit_date'] = base_dates[i] if i < len(base_dates) else None
+            new_row['num_changed_files'] = num_files[i] if i < len(num_files) else None
+            new_row['changed_files_list'] = files_list[i] if i < len(files_list) else None
+            rows.append(new_row)
+
+    exploded_df = pd.DataFrame(rows)
+    return exploded_df.drop(columns=['base_commit_ids', 'base_commit_dates'])
+
+
+def legacy_explode_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    data_explode = []
+    for orig_id, row in df.iterrows():
+        dct_base = {k: v for k, v in row.to_dict().items() if k not in GROUP1 + GROUP2}
+        n_group1 = len(row[GROUP1[0]])
+        n_group2 = max(1, len(row[GROUP2[0]]))
+        for ind1 in range(n_group1):
+            dct_base_commits = {k: row[k][ind1] for k in GROUP1}
+            for ind2 in range(n_group2):
+                dct_linked_issue = {k: row[k][ind2] if len(row[k]) != 0 else None for k in GROUP2}
+                data_explode.append({**{"orig_id": orig_id}, **dct_base, **dct_base_commits, **dct_linked_issue})
+    return pd.DataFrame(data_explode)
+
+
+def explode_base_commits(df: pd.DataFrame) -> pd.DataFrame:
+    # Same as scraper_v03.explode_base_commits on already parsed lists, without importing the scraper.
+    exploded_df = explode_groups(df, GROUP1)
+    exploded_df = exploded_df.rename(columns={'base_commit_ids': 'base_commit', 'base_commit_dates': 'base_commit_date'})
+    columns = [col for col in df.columns if col not in ('base_commit_ids', 'base_commit_dates')]
+    return exploded_df[columns + ['base_commit', 'base_commit_date']]
+
+
+def make_rows(n: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic crawl rows: 1-3 base commits (mostly 2), 0-3 linked issues, up to 40 files each."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        n_base = rng.choice([1, 2, 2, 2, 3])
+        n_issues = rng.choice([0, 0, 1, 1, 2, 3])
+        files = [[f"pkg/mod{rng.randrange(500)}.py" for _ in range(rng.randrange(40))] for _ in range(n_base)]
+        rows.append({
+            'repo_name': 'owner/repo',
+            'base_commit_ids': [f"{rng.getrandbits(160):040x}" for _ in range(n_base)],
+            'base_commit_dates': ['2025-03-22 12:15:07 +0900'] * n_base,
+            'resolving_commit_id': f"{rng.getrandbits(160):040x}",
+            'resolving_commit_date': '2025-03-22 17:00:41 +0000',
+            'pr_num': i,
+            'pr_close_date': '2025-03-22T17:00:42Z',
+            'pr_open_date': '2025-03-21T12:47:19Z',
+            'num_changed_files': [len(f) for f in files],
+            'changed_files_list': files,
+            'linked_issue_nums': [rng.randrange(30000) for _ in range(n_issues)],
+            '_linked_issue_desc': 'Issue #1: text ' * 20 if n_issues else None,
+            '_pr_description': 'Merge pull request #1 from a/b\n\n' + 'words ' * 50,
+            'linked_issue_date_open': ['2025-01-01T00:00:00Z'] * n_issues,
+            'linked_issue_date_closed': ['2025-02-01T00:00:00Z'] * n_issues,
+        })
+    return pd.DataFrame(rows)
+
+
+def timed(label: str, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<40} {time.perf_counter() - started:8.2f}s  {len(result):>9} rows")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the vectorized versions")
+    args = parser.parse_args()
+
+    df = make_rows(args.rows)
+    print(f"{args.rows} input rows")
+    new_single = timed("explode_groups (base commits)", explode_base_commits, df)
+    new_cross = timed("explode_groups (base commits x issues)", explode_groups, df, GROUP1, GROUP2, "orig_id")
+    if args.skip_legacy:
+        return
+    old_single = timed("legacy explode_base_commits", legacy_explode_base_commits, df)
+    old_cross = timed("legacy notebook explode_dataframe", legacy_explode_dataframe, df)
+
+    pd.testing.assert_frame_equal(new_single, old_single, check_dtype=False)
+    pd.testing.assert_frame_equal(new_cross, old_cross, check_dtype=False)
+    print("Outputs match")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Throughput of batched issue-reference extraction against the per-message regex calls it replaced.
+
+    python benchmarks/bench_issue_refs.py --messages 200000
+    python benchmarks/bench_issue_refs.py --repo path/to/clone   # real merge messages from git log
+
+The legacy functions are copied here so the numbers stay comparable.
+"""
+import argparse
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from issue_refs import closing_issues_batch, pr_numbers_batch  # noqa: E402
+
+
+def legacy_parse_issue_number(message):
+    match = re.search(r'(?:fixes|closes|resolves)?\s*#(\d+)', message, re.IGNORECASE) if message else None
+    return match.group(1) if match else None
+
+
+def legacy_parse_linked_issues(pr_body):
+    issue_numbers = re.findall(r"(?:fixes|closes|resolves)\s+#(\d+)", str(pr_body), re.IGNORECASE)
+    issue_numbers = [num for num in issue_numbers if num != "1234"]
+    return list(set(issue_numbers))
+
+
+def make_corpus(n: int, seed: int = 0):
+    """Synthetic merge messages and PR bodies of realistic length and reference density."""
+    rng = random.Random(seed)
+    words = "the a fix for in of parser update tests docs refactor handle edge case when value is none".split()
+    messages, bodies = [], []
+    for _ in range(n):
+        text = " ".join(rng.choice(words) for _ in range(rng.randrange(20, 200)))
+        number = rng.randrange(1, 30000)
+        if rng.random() < 0.7:
+            messages.append(f"Merge pull request #{number} from user/branch-{number}\n\n{text[:80]}")
+        else:
+            messages.append(f"{text[:60]} (#{number})\n\n{text}")
+        refs = rng.choice(["", f"Fixes #{number + 1}", f"closes #{number + 2} and resolved owner/repo#{number}",
+                           f"See #{number + 3}", "Fixes #1234"])
+        bodies.append(f"{text}\n\n{refs}\n\n{text[:100]}")
+    return messages, bodies
+
+
+def read_repo_messages(repo_path: str):
+    output = subprocess.run(["git", "-C", repo_path, "log", "--merges", "--format=%B%x00"],
+                            capture_output=True, text=True, check=True).stdout
+    messages = [message.strip() for message in output.split("\x00") if message.strip()]
+    return messages, messages
+
+
+def timed(label: str, func, count: int):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<36} {elapsed:7.2f}s  {count / elapsed:12,.0f} texts/s")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--repo", help="Use the merge messages of this repository instead of a synthetic corpus")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    messages, bodies = read_repo_messages(args.repo) if args.repo else make_corpus(args.messages)
+    print(f"{len(messages)} messages, {sum(map(len, messages)) + sum(map(len, bodies)):,} characters")
+
+    def batched(func, texts):
+        return [result for start in range(0, len(texts), args.batch_size) for result in func(texts[start:start + args.batch_size])]
+
+    legacy_prs = timed("legacy parse_issue_number", lambda: [legacy_parse_issue_number(m) for m in messages], len(messages))
+    new_prs = timed("pr_numbers_batch", lambda: batched(pr_numbers_batch, messages), len(messages))
+    legacy_linked = timed("legacy parse_linked_issues", lambda: [legacy_parse_linked_issues(b) for b in bodies], len(bodies))
+    new_linked = timed("closing_issues_batch", lambda: batched(closing_issues_batch, bodies), len(bodies))
+
+    same_pr = sum(str(new) == str(old) if new is not None else old is None for new, old in zip(new_prs, legacy_prs))
+    superset = sum(set(map(int, old)) <= set(new) for new, old in zip(new_linked, legacy_linked))
+    print(f"PR numbers equal to legacy: {same_pr}/{len(messages)}; "
+          f"closing refs covering legacy: {superset}/{len(bodies)}")
+
+
+if __name__ == '__main__':
+    main()
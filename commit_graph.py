@@ -0,0 +1,53 @@
+import logging
+import os
+import subprocess
+
+
+def is_shallow(repo_path: str) -> bool:
+    """Returns True for a shallow repository, where Git ignores commit-graph files."""
+    output = subprocess.run(["git", "-C", repo_path, "rev-parse", "--is-shallow-repository"],
+                            capture_output=True, text=True).stdout
+    return output.strip() == "true"
+
+
+def has_commit_graph(repo_path: str) -> bool:
+    """Returns True if the repository already has a commit-graph (single file or split chain)."""
+    output = subprocess.run(["git", "-C", repo_path, "rev-parse", "--git-path", "objects/info"],
+                            capture_output=True, text=True).stdout.strip()
+    info = os.path.join(repo_path, output) if output else ""
+    return bool(output) and (os.path.exists(os.path.join(info, "commit-graph"))
+                             or os.path.exists(os.path.join(info, "commit-graphs", "commit-graph-chain")))
+
+
+def write_commit_graph(repo_path: str, changed_paths: bool = True, split: bool = False) -> bool:
+    """
+    Writes `git commit-graph write --reachable [--changed-paths]` for a repository.
+
+    The commit-graph lets history walks (`git log --since`, `rev-list`, revision
+    ranges) read parents, dates and generation numbers without parsing commit
+    objects, and changed-path Bloom filters let path-limited walks skip commits
+    that do not touch the path. Shallow repositories are skipped.
+
+    Args:
+        repo_path (str): The path to the Git repository.
+        changed_paths (bool, optional): Also compute changed-path Bloom filters. Defaults to True.
+        split (bool, optional): Add an incremental layer for new commits instead of rewriting the
+            whole graph, e.g. after a fetch. Defaults to False.
+
+    Returns:
+        bool: True if the graph was written.
+    """
+    if is_shallow(repo_path):
+        logging.info(f"Not writing a commit-graph for shallow repository {repo_path}")
+        return False
+    command = ["git", "-C", repo_path, "commit-graph", "write", "--reachable", "--no-progress"]
+    if changed_paths:
+        command.append("--changed-paths")
+    if split:
+        command.append("--split")
+    try:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        logging.warning(f"Failed to write commit-graph for {repo_path}: {e.stderr.strip()}")
+        return False
+    return True
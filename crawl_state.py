@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+
+class CrawlState:
+    """
+    Progress of a crawl, persisted between runs.
+
+    Per repository it keeps the newest commit already scanned, so a rerun only
+    scans `<last_sha>..HEAD`; per output batch it keeps whether the batch was
+    extracted (its rows wait for enrichment in a temp CSV), enriched (its rows
+    wait in a temp CSV to be appended at a reserved position), fully appended,
+    or appended with some repositories failed (to be run again).
+    Every change is written to a temp file and renamed over the state file, so
+    a killed job leaves either the old or the new state, never a torn one.
+
+    Args:
+        path (str, optional): The JSON state file. Defaults to "crawl_state.json".
+    """
+
+    def __init__(self, path: str = "crawl_state.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {"repos": {}, "batches": {}}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.data.update(json.load(f))
+
+    def save(self) -> None:
+        """Atomically replaces the state file with the current state."""
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".crawl_state.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(self.data, f, indent=1, sort_keys=True)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+    def last_commit(self, repo_name: str) -> Optional[str]:
+        """Returns the newest commit already scanned for a repository, if any."""
+        return self.data["repos"].get(repo_name, {}).get("last_sha")
+
+    def record_repo(self, repo_name: str, last_sha: str, last_date: Optional[str] = None) -> None:
+        """
+        Records the newest scanned commit of a repository (call `save` to persist).
+
+        Args:
+            repo_name (str): The repository name.
+            last_sha (str): The commit the scan ran up to.
+            last_date (Optional[str], optional): Its commit date. Defaults to None.
+        """
+        with self._lock:
+            self.data["repos"][repo_name] = {"last_sha": last_sha, "last_date": last_date}
+
+    def batch(self, key: str, repos: List[str]) -> Optional[Dict[str, object]]:
+        """
+        Returns the saved record of a batch, provided it covers the same repositories.
+
+        Args:
+            key (str): The batch key, e.g. "<final csv>:<batch index>".
+            repos (List[str]): The repositories of the batch in this run.
+
+        Returns:
+            Optional[Dict[str, object]]: The record with 'status' ("extracted", "enriched", "done" or
+                "partial"), 'repos', 'temp_csv', 'heads', 'position' and 'failed', or None.
+        """
+        record = self.data["batches"].get(key)
+        return record if record is not None and record.get("repos") == list(repos) else None
+
+    def record_batch(self, key: str, repos: List[str], status: str, temp_csv: Optional[str] = None,
+                     heads: Optional[Dict[str, List[str]]] = None, position: Optional[int] = None,
+                     failed: Optional[List[str]] = None) -> None:
+        """
+        Records the status of a batch (call `save` to persist).
+
+        Args:
+            key (str): The batch key.
+            repos (List[str]): The repositories of the batch.
+            status (str): "extracted" once the rows are in `temp_csv`, "enriched" once the enriched rows
+                are, "done" once appended, "partial" once appended while some repositories failed.
+            temp_csv (Optional[str], optional): The file holding the rows. Defaults to None.
+            heads (Optional[Dict[str, List[str]]], optional): Per repository, the scanned
+                [sha, date] to record once the batch is done. Defaults to None.
+            position (Optional[int], optional): Where an enriched batch goes: the offset in the output CSV
+                or the part number in the output sink. Defaults to None.
+            failed (Optional[List[str]], optional): Repositories that could not be cloned or extracted.
+                Defaults to None.
+        """
+        with self._lock:
+            self.data["batches"][key] = {"repos": list(repos), "status": status, "temp_csv": temp_csv,
+                                         "heads": heads or {}, "position": position, "failed": failed or []}
+
+    def clear_batches(self, prefix: str) -> None:
+        """
+        Forgets the batch records whose key starts with `prefix`, once their crawl has finished
+        (call `save` to persist).
+        """
+        with self._lock:
+            self.data["batches"] = {key: record for key, record in self.data["batches"].items()
+                                    if not key.startswith(prefix)}
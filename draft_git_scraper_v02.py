@@ -5,9 +5,9 @@ import re
 import requests
 import pandas as pd
 import csv
-from typing import List, Tuple, Optional
+from typing import Callable, Iterable, List, Tuple, Optional
 
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", insert you key)
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 
 def run_git_command(repo_path: str, command: List[str]) -> Optional[str]:
     """
@@ -372,10 +372,168 @@ def initialize_csv(filename: str) -> None:
                 '_linked_issue_desc', '_pr_description', 'linked_issue_date_open', 'linked_issue_date_closed'
             ])
 
+import io
 import subprocess
 from pathlib import Path
 
-def fetch_git_diff(folder: str, base_commit_before: str, base_commit_after: str) -> str:
+from path_classifier import DEFAULT_CLASSIFIER
+
+def is_test_diff_header(header: str) -> bool:
+    """
+    Decides whether a `diff --git` file section belongs to the test patch.
+
+    Args:
+        header: The `diff --git a/... b/...` line of the section
+
+    Returns:
+        True if the section changes a test file, see `path_classifier.DEFAULT_CLASSIFIER`
+    """
+    return DEFAULT_CLASSIFIER.is_test_diff_header(header)
+
+class DiffSplitter:
+    """
+    Routes the lines of a `git diff` to the full, non-test and test patches in one pass.
+
+    Lines are fed one at a time, so a diff read from a pipe is never held whole:
+    only the current file section is buffered until it is known to be kept.
+    Sections of binary files are dropped, as are sections larger than
+    `max_file_bytes`; once the full patch would grow past `max_total_bytes`
+    the splitter stops accepting input.
+
+    Args:
+        is_test: Predicate on the `diff --git` header line of a section, e.g. the
+            `is_test_diff_header` of a per-repository `TestFileClassifier`
+        max_file_bytes: Drop file sections larger than this (None for no limit)
+        max_total_bytes: Stop once the full patch would exceed this (None for no limit)
+        skip_binary: Drop sections of binary files
+    """
+
+    def __init__(self, is_test: Callable[[str], bool] = is_test_diff_header, max_file_bytes: Optional[int] = None,
+                 max_total_bytes: Optional[int] = None, skip_binary: bool = True):
+        self.is_test = is_test
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.skip_binary = skip_binary
+        self.full, self.patch, self.test_patch = [], [], []
+        self.total_bytes = 0
+        self.skipped: List[str] = []
+        self.truncated = False
+        self._section: List[str] = []
+        self._section_bytes = 0
+        self._dropped = False
+        self._header: Optional[str] = None
+
+    def _flush(self) -> None:
+        section, header = self._section, self._header
+        self._section, self._section_bytes, self._dropped = [], 0, False
+        if self.truncated or not section:
+            return
+        if header is None:
+            # Anything before the first `diff --git` only goes to the full patch
+            self.full.extend(section)
+            return
+        size = sum(len(line) for line in section)
+        if self.max_total_bytes is not None and self.total_bytes + size > self.max_total_bytes:
+            self.truncated = True
+            return
+        self.total_bytes += size
+        self.full.extend(section)
+        (self.test_patch if self.is_test(header) else self.patch).extend(section)
+
+    def _drop(self, reason: str) -> None:
+        self.skipped.append(f"{self._header.rstrip()} ({reason})")
+        self._section, self._dropped = [], True
+
+    def feed(self, line: str) -> bool:
+        """
+        Adds one diff line (with its line ending).
+
+        Returns:
+            False once the total size cap is reached and further input is ignored
+        """
+        if line.startswith("diff --git"):
+            self._flush()
+            self._header = line
+        if self.truncated:
+            return False
+        if self._dropped:
+            return True
+        if self._header is not None and self.skip_binary and (line.startswith("Binary files ") or line.startswith("GIT binary patch")):
+            self._drop("binary")
+            return True
+        self._section.append(line)
+        self._section_bytes += len(line)
+        if self._header is not None and self.max_file_bytes is not None and self._section_bytes > self.max_file_bytes:
+            self._drop(f"over {self.max_file_bytes} bytes")
+        return True
+
+    def close(self) -> Tuple[str, str, str]:
+        """
+        Finishes the last section.
+
+        Returns:
+            The full patch, the non-test patch and the test patch
+        """
+        self._flush()
+        if self.skipped:
+            logging.info(f"Skipped {len(self.skipped)} file sections: {self.skipped[:5]}")
+        if self.truncated:
+            logging.warning(f"Diff truncated at {self.total_bytes} bytes (limit {self.max_total_bytes})")
+        return "".join(self.full), "".join(self.patch), "".join(self.test_patch)
+
+def split_diff(git_diff: Iterable[str], **kwargs) -> Tuple[str, str, str]:
+    """
+    Splits a diff into full, non-test and test patches in one pass.
+
+    Args:
+        git_diff: The diff as a string or as an iterable of lines
+        **kwargs: Options of `DiffSplitter`
+
+    Returns:
+        The full patch, the non-test patch and the test patch
+    """
+    splitter = DiffSplitter(**kwargs)
+    for line in (git_diff.splitlines(keepends=True) if isinstance(git_diff, str) else git_diff):
+        if not splitter.feed(line):
+            break
+    return splitter.close()
+
+def stream_git_diff(folder: str, base_commit_before: str, base_commit_after: str, newline: Optional[str] = "",
+                    **kwargs) -> Tuple[str, str, str]:
+    """
+    Streams `git diff` between two commits through a `DiffSplitter`.
+
+    The diff is read from the git pipe line by line; when the total size cap is
+    reached, git is stopped instead of being read to the end.
+
+    Args:
+        folder: Path to the git repository
+        base_commit_before: The older commit hash
+        base_commit_after: The newer commit hash
+        newline: Line ending handling of the pipe, as for `io.TextIOWrapper`. The default keeps
+            CRLF endings byte-exact, so the patches apply; None translates them to "\\n"
+        **kwargs: Options of `DiffSplitter` (is_test, max_file_bytes, max_total_bytes, skip_binary)
+
+    Returns:
+        The full patch, the non-test patch and the test patch
+    """
+    folder = str(Path(folder).resolve())
+    command = ["git", "-C", folder, "diff", f"{base_commit_before}..{base_commit_after}"]
+    splitter = DiffSplitter(**kwargs)
+    stopped = False
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        for line in io.TextIOWrapper(process.stdout, encoding="utf-8", errors="replace", newline=newline):
+            if not splitter.feed(line):
+                stopped = True
+                process.kill()
+                break
+        stderr = process.stderr.read()
+        returncode = process.wait()
+    if returncode != 0 and not stopped:
+        raise subprocess.CalledProcessError(returncode, command, stderr=stderr)
+    return splitter.close()
+
+def fetch_git_diff(folder: str, base_commit_before: str, base_commit_after: str, **kwargs) -> str:
     """
     Fetch git diff between two commits in the specified repository folder.
     
@@ -383,21 +541,15 @@ def fetch_git_diff(folder: str, base_commit_before: str, base_commit_after: str)
         folder: Path to the git repository
         base_commit_before: The older commit hash
         base_commit_after: The newer commit hash
+        **kwargs: Options of `DiffSplitter`, e.g. size caps. Binary sections are kept
+            unless `skip_binary=True` is passed, and line endings are normalized to "\\n",
+            as this function always did
     
     Returns:
         The git diff as a string
     """
-    # Convert to absolute path and resolve any symlinks
-    folder = str(Path(folder).resolve())
-    
-    # Run git diff command
-    result = subprocess.run(
-        ["git", "-C", folder, "diff", f"{base_commit_before}..{base_commit_after}"],
-        capture_output=True,
-        text=True,
-        check=True
-    )
-    return result.stdout
+    kwargs.setdefault("skip_binary", False)
+    return stream_git_diff(folder, base_commit_before, base_commit_after, newline=None, **kwargs)[0]
 
 def get_test_patch(git_diff: str) -> str:
     """
@@ -409,33 +561,7 @@ def get_test_patch(git_diff: str) -> str:
     Returns:
         A diff string containing only test files (files that match common test patterns)
     """
-    test_patches = []
-    current_patch = []
-    in_patch = False
-    is_test_file = False
-    
-    for line in git_diff.splitlines(keepends=True):
-        if line.startswith("diff --git"):
-            # Process the previous patch if we were in one
-            if in_patch and is_test_file:
-                test_patches.extend(current_patch)
-            
-            # Reset for new patch
-            current_patch = [line]
-            in_patch = True
-            is_test_file = False
-            
-            # Check if this is a test file
-            if "test/" in line or "tests/" in line or "_test.py" in line or "test_" in line:
-                is_test_file = True
-        elif in_patch:
-            current_patch.append(line)
-    
-    # Add the last patch if it was a test file
-    if in_patch and is_test_file:
-        test_patches.extend(current_patch)
-    
-    return "".join(test_patches)
+    return split_diff(git_diff, skip_binary=False)[2]
 
 def get_patch(git_diff: str) -> str:
     """
@@ -447,33 +573,7 @@ def get_patch(git_diff: str) -> str:
     Returns:
         A diff string containing only non-test files
     """
-    other_patches = []
-    current_patch = []
-    in_patch = False
-    is_test_file = False
-    
-    for line in git_diff.splitlines(keepends=True):
-        if line.startswith("diff --git"):
-            # Process the previous patch if we were in one
-            if in_patch and not is_test_file:
-                other_patches.extend(current_patch)
-            
-            # Reset for new patch
-            current_patch = [line]
-            in_patch = True
-            is_test_file = False
-            
-            # Check if this is a test file
-            if "test/" in line or "tests/" in line or "_test.py" in line or "test_" in line:
-                is_test_file = True
-        elif in_patch:
-            current_patch.append(line)
-    
-    # Add the last patch if it wasn't a test file
-    if in_patch and not is_test_file:
-        other_patches.extend(current_patch)
-    
-    return "".join(other_patches)
+    return split_diff(git_diff, skip_binary=False)[1]
 
 # # Example of ussage
 # folder = "/data/adam/build_ecs_gigacode_worker/mtsai/dynamic_bench/repos/sympy"
@@ -484,6 +584,8 @@ def get_patch(git_diff: str) -> str:
 # full_diff = fetch_git_diff(folder, base_commit_before, base_commit_after)
 # test_patch = get_test_patch(full_diff)
 # patch = get_patch(full_diff)
+# # or, in one pass over the git pipe:
+# full_diff, patch, test_patch = stream_git_diff(folder, base_commit_before, base_commit_after, max_file_bytes=1 << 20)
 
 # open("dynamic_bench/repos/full_diff.txt", "w+").write(full_diff)
 # open("dynamic_bench/repos/test_patch.txt", "w+").write(test_patch)
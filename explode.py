@@ -0,0 +1,77 @@
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def _lengths(column: pd.Series) -> np.ndarray:
+    return column.map(len, na_action="ignore").fillna(0).to_numpy(dtype=np.int64)
+
+
+def _aligned(column: pd.Series, lengths: np.ndarray) -> pd.Series:
+    # Cells shorter than their row's key list are padded with None, longer ones cut,
+    # so every column of a group explodes to the same number of values.
+    mismatched = np.flatnonzero(_lengths(column) != lengths)
+    if not len(mismatched):
+        return column
+    values = column.to_numpy(dtype=object).copy()
+    for i in mismatched:
+        value = values[i]
+        items = list(value) if isinstance(value, (list, tuple, np.ndarray)) else []
+        values[i] = (items + [None] * int(lengths[i]))[:int(lengths[i])]
+    return pd.Series(values, index=column.index)
+
+
+def _flatten(column: pd.Series) -> np.ndarray:
+    # Every cell holds at least one value here, so `explode` yields exactly sum(lengths) values.
+    return column.explode().to_numpy()
+
+
+def explode_groups(df: pd.DataFrame, group1: List[str], group2: Optional[List[str]] = None,
+                   index_column: Optional[str] = None) -> pd.DataFrame:
+    """
+    Explodes aligned list columns into one row per element, without a Python loop over rows.
+
+    The columns of `group1` are exploded together, element by element, and so are
+    those of `group2`; each row yields the cross product of its group1 and group2
+    elements. A row with an empty group1 list yields no rows; an empty group2 list
+    yields None in the group2 columns. Within a group, lists shorter than the first
+    column's are padded with None.
+
+    Args:
+        df (pd.DataFrame): Rows whose group columns hold lists (or arrays).
+        group1 (List[str]): Columns exploded together; the first one decides the row count.
+        group2 (Optional[List[str]], optional): A second group crossed with the first. Defaults to None.
+        index_column (Optional[str], optional): Store the original index in this column and
+            return a fresh RangeIndex; by default the original index labels are repeated.
+
+    Returns:
+        pd.DataFrame: The other columns in their original order, then the group1 and group2 columns.
+    """
+    group2 = group2 or []
+    n1 = _lengths(df[group1[0]])
+    df = df[n1 > 0]
+    n1 = n1[n1 > 0]
+    n2 = np.maximum(_lengths(df[group2[0]]), 1) if group2 else np.ones(len(df), dtype=np.int64)
+
+    per_row = n1 * n2
+    total = int(per_row.sum())
+    rows = np.repeat(np.arange(len(df)), per_row)
+    # Position of each output row inside its source row: group1 index = k // n2, group2 index = k % n2.
+    within = np.arange(total) - np.repeat(np.cumsum(per_row) - per_row, per_row)
+    row_n2 = n2[rows]
+    take1 = np.repeat(np.cumsum(n1) - n1, per_row) + within // row_n2
+    take2 = np.repeat(np.cumsum(n2) - n2, per_row) + within % row_n2
+
+    others = [column for column in df.columns if column not in group1 and column not in group2]
+    result = df[others].take(rows)
+    for column in group1:
+        result[column] = _flatten(_aligned(df[column], n1))[take1] if total else []
+    for column in group2:
+        result[column] = _flatten(_aligned(df[column], n2))[take2] if total else []
+    result = result.infer_objects()
+
+    if index_column is not None:
+        result.insert(0, index_column, result.index)
+        result = result.reset_index(drop=True)
+    return result
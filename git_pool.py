@@ -0,0 +1,221 @@
+import subprocess
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+
+def format_git_date(timestamp: int, offset: str) -> str:
+    """
+    Formats a raw commit timestamp the way `git show --format=%ci` does.
+
+    Args:
+        timestamp (int): Seconds since the epoch.
+        offset (str): The timezone offset, e.g. "+0300".
+
+    Returns:
+        str: The date as "YYYY-MM-DD HH:MM:SS +ZZZZ".
+    """
+    sign = -1 if offset.startswith('-') else 1
+    minutes = sign * (int(offset[1:3]) * 60 + int(offset[3:5]))
+    date = datetime.fromtimestamp(timestamp, timezone(timedelta(minutes=minutes)))
+    return date.strftime('%Y-%m-%d %H:%M:%S ') + offset
+
+
+def parse_commit_object(data: bytes) -> Dict[str, object]:
+    """
+    Parses a raw commit object as returned by `git cat-file --batch`.
+
+    Args:
+        data (bytes): The commit object contents.
+
+    Returns:
+        Dict[str, object]: The 'parents', 'date' (committer date in %ci format) and 'message' of the commit.
+    """
+    header, _, message = data.partition(b'\n\n')
+    parents, date, encoding = [], "Unknown", 'utf-8'
+    for line in header.split(b'\n'):
+        if line.startswith(b'parent '):
+            parents.append(line[7:].decode('ascii'))
+        elif line.startswith(b'committer '):
+            _, timestamp, offset = line.decode('utf-8', 'replace').rsplit(' ', 2)
+            date = format_git_date(int(timestamp), offset)
+        elif line.startswith(b'encoding '):
+            encoding = line[9:].decode('ascii')
+    try:
+        text = message.decode(encoding, 'replace')
+    except LookupError:
+        text = message.decode('utf-8', 'replace')
+    return {'parents': parents, 'date': date, 'message': text}
+
+
+class GitRepoWorkers:
+    """
+    Long-lived git processes for one repository.
+
+    Commit lookups go through `git cat-file --batch`, name-only diffs through
+    `git diff-tree --stdin`. Both are started lazily and reused for every query.
+    """
+
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self.spawned = 0
+        self.queries = 0
+        self._cat_file = None
+        self._diff_tree = None
+        self._cat_file_lock = threading.Lock()
+        self._diff_tree_lock = threading.Lock()
+
+    def _spawn(self, command: List[str]) -> subprocess.Popen:
+        self.spawned += 1
+        return subprocess.Popen(
+            ['git', '-C', self.repo_path] + command,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+
+    def read_commit(self, rev: str) -> Optional[Dict[str, object]]:
+        """
+        Reads and parses a commit object.
+
+        Args:
+            rev (str): The commit hash or revision.
+
+        Returns:
+            Optional[Dict[str, object]]: The parsed commit (see `parse_commit_object`), or None if it is missing.
+        """
+        with self._cat_file_lock:
+            if self._cat_file is None or self._cat_file.poll() is not None:
+                self._cat_file = self._spawn(['cat-file', '--batch'])
+            process = self._cat_file
+            try:
+                process.stdin.write(f"{rev}^{{commit}}\n".encode())
+                process.stdin.flush()
+                header = process.stdout.readline().split()
+                if len(header) != 3:
+                    return None
+                data = process.stdout.read(int(header[2]))
+                process.stdout.read(1)
+            except (OSError, ValueError) as e:
+                logging.error(f"git cat-file worker failed for {self.repo_path}: {e}")
+                self._cat_file = None
+                return None
+            self.queries += 1
+        return parse_commit_object(data)
+
+    def changed_files(self, parent_commit: str, merge_commit: str) -> Optional[List[str]]:
+        """
+        Lists the files changed between a parent commit and a merge commit.
+
+        Each query is followed by a `<merge> <merge>` line whose empty diff
+        only prints a header, which marks the end of the answer on the pipe.
+
+        Args:
+            parent_commit (str): The parent commit hash.
+            merge_commit (str): The merge commit hash.
+
+        Returns:
+            Optional[List[str]]: The changed file paths, or None if the worker failed.
+        """
+        with self._diff_tree_lock:
+            if self._diff_tree is None or self._diff_tree.poll() is not None:
+                self._diff_tree = self._spawn(
+                    ['diff-tree', '--stdin', '-r', '-M', '--name-only', '--always', '--format=%x00']
+                )
+            process = self._diff_tree
+            try:
+                process.stdin.write(f"{merge_commit} {parent_commit}\n{merge_commit} {merge_commit}\n".encode())
+                process.stdin.flush()
+                files, headers = [], 0
+                while headers < 2:
+                    line = process.stdout.readline()
+                    if not line:
+                        raise OSError("diff-tree exited")
+                    if line.startswith(b'\x00'):
+                        headers += 1
+                    elif line.strip():
+                        files.append(line.rstrip(b'\n').decode('utf-8', 'replace'))
+            except OSError as e:
+                logging.error(f"git diff-tree worker failed for {self.repo_path}: {e}")
+                self._diff_tree = None
+                return None
+            self.queries += 1
+        return files
+
+    def close(self) -> None:
+        """Terminates the worker processes."""
+        for process in (self._cat_file, self._diff_tree):
+            if process is not None:
+                try:
+                    process.stdin.close()
+                    process.wait(timeout=5)
+                except (OSError, subprocess.TimeoutExpired):
+                    process.kill()
+        self._cat_file = self._diff_tree = None
+
+
+class GitWorkerPool:
+    """
+    Keeps `GitRepoWorkers` for the most recently used repositories.
+
+    Args:
+        max_repos (int, optional): Number of repositories kept open at once. Defaults to 8.
+    """
+
+    def __init__(self, max_repos: int = 8):
+        self.max_repos = max_repos
+        self._workers = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed_spawned = 0
+        self._closed_queries = 0
+
+    def get(self, repo_path: str) -> GitRepoWorkers:
+        """Returns the workers for a repository, starting them if needed."""
+        with self._lock:
+            workers = self._workers.get(repo_path)
+            if workers is None:
+                workers = self._workers[repo_path] = GitRepoWorkers(repo_path)
+                while len(self._workers) > self.max_repos:
+                    _, evicted = self._workers.popitem(last=False)
+                    self._retire(evicted)
+            else:
+                self._workers.move_to_end(repo_path)
+            return workers
+
+    def read_commit(self, repo_path: str, rev: str) -> Optional[Dict[str, object]]:
+        return self.get(repo_path).read_commit(rev)
+
+    def changed_files(self, repo_path: str, parent_commit: str, merge_commit: str) -> Optional[List[str]]:
+        return self.get(repo_path).changed_files(parent_commit, merge_commit)
+
+    def close(self, repo_path: Optional[str] = None) -> None:
+        """
+        Terminates the workers of one repository, or of all repositories.
+
+        Args:
+            repo_path (Optional[str], optional): The repository to close. Defaults to None (all).
+        """
+        with self._lock:
+            paths = [repo_path] if repo_path is not None else list(self._workers)
+            for path in paths:
+                workers = self._workers.pop(path, None)
+                if workers is not None:
+                    self._retire(workers)
+
+    def _retire(self, workers: GitRepoWorkers) -> None:
+        workers.close()
+        self._closed_spawned += workers.spawned
+        self._closed_queries += workers.queries
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns process counters.
+
+        Returns:
+            Dict[str, int]: 'spawned' processes, answered 'queries', and 'spawns_avoided'
+                compared with one `git` process per query.
+        """
+        with self._lock:
+            spawned = self._closed_spawned + sum(w.spawned for w in self._workers.values())
+            queries = self._closed_queries + sum(w.queries for w in self._workers.values())
+        return {'spawned': spawned, 'queries': queries, 'spawns_avoided': max(queries - spawned, 0)}
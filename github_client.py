@@ -0,0 +1,355 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import ResponseCache
+
+API_URL = "https://api.github.com"
+
+
+class RateLimiter:
+    """
+    Rate-limit budget shared by all requests of a crawl, tracked per credential.
+
+    Each credential's remaining quota and reset time are refreshed from the
+    `X-RateLimit-Remaining`/`X-RateLimit-Reset` headers of its responses, and a
+    secondary-limit `Retry-After` blocks it for the given time. `acquire` hands
+    out the credential with the most headroom and only blocks, with all workers
+    waiting together, once every credential is exhausted or blocked.
+    """
+
+    def __init__(self):
+        self.remaining: Dict[Optional[str], Optional[int]] = {}
+        self.reset_at: Dict[Optional[str], float] = {}
+        self.blocked_until: Dict[Optional[str], float] = {}
+        self.uses: Dict[Optional[str], int] = {}
+        self._cond = threading.Condition()
+
+    def _headroom(self, credential: Optional[str], cost: int, now: float) -> Optional[float]:
+        if self.blocked_until.get(credential, 0) > now:
+            return None
+        remaining = self.remaining.get(credential)
+        if remaining is None:
+            return float("inf")
+        return remaining if remaining >= cost else None
+
+    def _available_at(self, credential: Optional[str], cost: int) -> float:
+        blocked_until = self.blocked_until.get(credential, 0)
+        remaining = self.remaining.get(credential)
+        if remaining is not None and remaining < cost:
+            return max(blocked_until, self.reset_at.get(credential, 0))
+        return blocked_until
+
+    def acquire(self, credentials: Sequence[Optional[str]] = (None,), cost: int = 1) -> Optional[str]:
+        """
+        Takes `cost` units of budget from the credential with the most headroom.
+
+        Credentials whose quota is not known yet count as having the most, and
+        ties go to the least used one. If none can pay, blocks until the first
+        one resets or is unblocked.
+
+        Args:
+            credentials (Sequence[Optional[str]], optional): The usable credentials; None is anonymous.
+                Defaults to anonymous only.
+            cost (int, optional): Units the request will consume. Defaults to 1.
+
+        Returns:
+            Optional[str]: The credential to send the request with.
+        """
+        with self._cond:
+            while True:
+                now = time.time()
+                headroom = {credential: self._headroom(credential, cost, now) for credential in credentials}
+                usable = [credential for credential in credentials if headroom[credential] is not None]
+                if usable:
+                    credential = max(usable, key=lambda c: (headroom[c], -self.uses.get(c, 0)))
+                    self.uses[credential] = self.uses.get(credential, 0) + 1
+                    if self.remaining.get(credential) is not None:
+                        self.remaining[credential] -= cost
+                    return credential
+                wake_at = min(self._available_at(credential, cost) for credential in credentials)
+                sleep_seconds = wake_at - now
+                if sleep_seconds <= 0:
+                    for credential in credentials:
+                        if self._available_at(credential, cost) <= now:
+                            self.remaining[credential] = None
+                    continue
+                logging.warning(f"Rate limit exceeded on all {len(credentials)} tokens. "
+                                f"Sleeping for {int(sleep_seconds) + 1} seconds...")
+                self._cond.wait(sleep_seconds + 1)
+
+    def update(self, headers, credential: Optional[str] = None) -> None:
+        """
+        Refreshes a credential's budget from response headers.
+
+        Args:
+            headers: The response headers.
+            credential (Optional[str], optional): The credential the request was sent with. Defaults to None.
+        """
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None:
+            return
+        with self._cond:
+            self.remaining[credential] = int(remaining)
+            if reset is not None:
+                self.reset_at[credential] = float(reset)
+            self._cond.notify_all()
+
+    def block(self, credential: Optional[str], seconds: float) -> None:
+        """
+        Keeps a credential unused for `seconds`, e.g. after a secondary rate limit's `Retry-After`.
+
+        Args:
+            credential (Optional[str]): The credential.
+            seconds (float): How long to wait before using it again.
+        """
+        with self._cond:
+            self.blocked_until[credential] = max(self.blocked_until.get(credential, 0), time.time() + seconds)
+            self._cond.notify_all()
+
+
+def _retry_after_seconds(value: str) -> float:
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return 60
+
+
+class GitHubClient:
+    """
+    GitHub REST client with a shared keep-alive session and a bounded number of requests in flight.
+
+    Several tokens can be given as a pool: each request goes out with the token
+    that has the most quota left, so the crawl only waits once all of them are
+    exhausted.
+
+    PR and issue lookups are coalesced by `(repo, kind, number)`: concurrent and
+    repeated lookups of the same resource share one request and one parsed result.
+    The table keeps the `max_resources` most recently used successful results;
+    errors are not kept, so the next lookup retries.
+
+    Args:
+        token (Union[None, str, Sequence[str]], optional): The GitHub token, or several tokens to pool.
+            Defaults to None (anonymous).
+        api_url (str, optional): The API root, e.g. a local mock server. Defaults to API_URL.
+        max_in_flight (int, optional): Maximum number of concurrent requests. Defaults to 8.
+        rate_limiter (Optional[RateLimiter], optional): A limiter shared with other clients. Defaults to a new one.
+        graphql_rate_limiter (Optional[RateLimiter], optional): The budget of GraphQL queries, which GitHub
+            counts separately from REST; kept for the client's lifetime. Defaults to a new one.
+        timeout (float, optional): Per-request timeout in seconds. Defaults to 30.
+        cache (Optional[ResponseCache], optional): On-disk cache used for conditional requests. Defaults to None.
+        max_resources (int, optional): Maximum number of PRs and issues kept in memory. Defaults to 50000.
+    """
+
+    def __init__(self, token: Union[None, str, Sequence[str]] = None, api_url: str = API_URL, max_in_flight: int = 8,
+                 rate_limiter: Optional[RateLimiter] = None, timeout: float = 30,
+                 cache: Optional[ResponseCache] = None, max_resources: int = 50_000,
+                 graphql_rate_limiter: Optional[RateLimiter] = None):
+        self.api_url = api_url.rstrip("/")
+        self.cache = cache
+        self.max_in_flight = max_in_flight
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.graphql_rate_limiter = graphql_rate_limiter or RateLimiter()
+        self.timeout = timeout
+        tokens = [token] if isinstance(token, str) else [t for t in token or [] if t]
+        self.credentials: List[Optional[str]] = list(dict.fromkeys(tokens)) or [None]
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.max_resources = max_resources
+        self._resources: "OrderedDict[Tuple[str, str, int], Future]" = OrderedDict()
+        self._resources_lock = threading.Lock()
+        self.fetched = 0
+        self.coalesced = 0
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_in_flight, pool_maxsize=max_in_flight)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept"] = "application/vnd.github.v3+json"
+
+    def request(self, method: str, path: str, rate_limiter: Optional[RateLimiter] = None, cost: int = 1,
+                **kwargs) -> requests.Response:
+        """
+        Sends a request with the token that has the most headroom, retrying on rate limits.
+
+        A primary limit (`X-RateLimit-Remaining: 0`) moves the request to another
+        token, or waits for the reset once all are exhausted; a secondary limit's
+        `Retry-After` takes only the token that hit it out of rotation for that long.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path relative to the API root.
+            rate_limiter (Optional[RateLimiter], optional): The budget to draw from, e.g. GraphQL's
+                separate one. Defaults to the client's REST limiter.
+            cost (int, optional): Budget units the request consumes. Defaults to 1.
+
+        Returns:
+            requests.Response: The final response.
+        """
+        url = f"{self.api_url}/{path.lstrip('/')}"
+        rate_limiter = rate_limiter or self.rate_limiter
+        headers = dict(kwargs.pop("headers", None) or {})
+        while True:
+            credential = rate_limiter.acquire(self.credentials, cost)
+            if credential is not None:
+                headers["Authorization"] = f"token {credential}"
+            with self._in_flight:
+                response = self.session.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+            rate_limiter.update(response.headers, credential)
+            if response.status_code in (403, 429):
+                retry_after = response.headers.get("Retry-After")
+                if retry_after is not None:
+                    seconds = _retry_after_seconds(retry_after)
+                    logging.warning(f"Secondary rate limit hit on {path}, resting the token for {int(seconds)} seconds")
+                    rate_limiter.block(credential, seconds)
+                    continue
+                if response.headers.get("X-RateLimit-Remaining") == "0":
+                    continue
+            return response
+
+    def get_json(self, path: str) -> Tuple[int, Optional[dict]]:
+        """
+        Fetches a JSON document, revalidating a cached copy with `If-None-Match`/`If-Modified-Since`.
+
+        Args:
+            path (str): The path relative to the API root.
+
+        Returns:
+            Tuple[int, Optional[dict]]: The status code and the decoded body (None unless the status is 200).
+                A 304 from the server is reported as 200 with the cached body.
+        """
+        url = f"{self.api_url}/{path.lstrip('/')}"
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is not None and cached['fresh']:
+            self.cache.hits += 1
+            self.cache.mark_used(url)
+            return 200, json.loads(cached['body'])
+
+        headers = {}
+        if cached is not None:
+            if cached['etag']:
+                headers["If-None-Match"] = cached['etag']
+            if cached['last_modified']:
+                headers["If-Modified-Since"] = cached['last_modified']
+        try:
+            response = self.request("GET", path, headers=headers)
+        except requests.RequestException as e:
+            logging.warning(f"Request to {path} failed: {e}")
+            return 0, None
+
+        if response.status_code == 304 and cached is not None:
+            self.cache.revalidated += 1
+            self.cache.touch(url)
+            return 200, json.loads(cached['body'])
+        if response.status_code != 200:
+            return response.status_code, None
+        if self.cache is not None:
+            self.cache.misses += 1
+            self.cache.put(url, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return 200, response.json()
+
+    def _remember(self, key: Tuple[str, str, int], future: Future) -> None:
+        # Callers hold _resources_lock.
+        self._resources[key] = future
+        self._resources.move_to_end(key)
+        while len(self._resources) > self.max_resources:
+            self._resources.popitem(last=False)
+
+    def _forget(self, key: Tuple[str, str, int], future: Future) -> None:
+        with self._resources_lock:
+            if self._resources.get(key) is future:
+                del self._resources[key]
+
+    def fetch(self, repo_name: str, kind: str, number: int) -> Tuple[int, Optional[dict]]:
+        """
+        Fetches `/repos/{repo}/{kind}/{number}` at most once per client.
+
+        The first caller performs the request; concurrent and later callers get
+        the same result. Only a 200 is kept: network errors, rate-limit 403s and
+        5xx responses are handed to the waiting callers and then dropped, so the
+        next call retries.
+
+        Args:
+            repo_name (str): The GitHub repository name.
+            kind (str): The resource collection, "pulls" or "issues".
+            number (int): The PR or issue number.
+
+        Returns:
+            Tuple[int, Optional[dict]]: The status code and the decoded body, as from `get_json`.
+        """
+        key = (repo_name, kind, int(number))
+        with self._resources_lock:
+            future = self._resources.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._remember(key, future)
+                self.fetched += 1
+            else:
+                self._resources.move_to_end(key)
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+
+        try:
+            result = self.get_json(f"repos/{repo_name}/{kind}/{int(number)}")
+        except BaseException as e:
+            self._forget(key, future)
+            future.set_exception(e)
+            raise
+        if result[0] != 200:
+            self._forget(key, future)
+        future.set_result(result)
+        return result
+
+    def prime(self, repo_name: str, kind: str, number: int, data: dict) -> None:
+        """
+        Seeds the resource table with an already known payload, e.g. from a GraphQL batch.
+
+        Args:
+            repo_name (str): The GitHub repository name.
+            kind (str): The resource collection, "pulls" or "issues".
+            number (int): The PR or issue number.
+            data (dict): The payload in REST shape.
+        """
+        future = Future()
+        future.set_result((200, data))
+        key = (repo_name, kind, int(number))
+        with self._resources_lock:
+            if key not in self._resources:
+                self._remember(key, future)
+
+    def has(self, repo_name: str, kind: str, number: int) -> bool:
+        """Returns True if the resource was already fetched, is in flight, or was primed."""
+        with self._resources_lock:
+            return (repo_name, kind, int(number)) in self._resources
+
+    def get_pull(self, repo_name: str, pr_number: int) -> Tuple[int, Optional[dict]]:
+        return self.fetch(repo_name, "pulls", pr_number)
+
+    def get_issue(self, repo_name: str, issue_number: int) -> Tuple[int, Optional[dict]]:
+        return self.fetch(repo_name, "issues", issue_number)
+
+    def map(self, func: Callable, items: Iterable) -> List:
+        """
+        Applies `func` to every item concurrently, at most `max_in_flight` at a time.
+
+        Returns:
+            List: The results, in input order.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            return list(executor.map(func, items))
+
+    def close(self) -> None:
+        self.session.close()
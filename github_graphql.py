@@ -0,0 +1,200 @@
+import json
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from github_client import GitHubClient
+
+PULL_FIELDS = (
+    "createdAt closedAt body "
+    "closingIssuesReferences(first: 25) { nodes { number createdAt closedAt body repository { nameWithOwner } } }"
+)
+ISSUE_FIELDS = (
+    "... on Issue { createdAt closedAt body } "
+    "... on PullRequest { createdAt closedAt body }"
+)
+
+
+def to_rest_shape(node: Optional[dict]) -> Optional[dict]:
+    """
+    Converts a GraphQL PR/issue node to the fields the REST helpers read.
+
+    Args:
+        node (Optional[dict]): The GraphQL node.
+
+    Returns:
+        Optional[dict]: A dict with 'created_at', 'closed_at' and 'body', or None for a missing node.
+    """
+    if node is None:
+        return None
+    return {"created_at": node.get("createdAt"), "closed_at": node.get("closedAt"), "body": node.get("body")}
+
+
+class GraphQLBatcher:
+    """
+    Fetches many PRs and issues per GitHub GraphQL query using aliased fields.
+
+    The batch size follows the `rateLimit { cost remaining resetAt }` of each
+    answer: it shrinks when a query costs more than `max_cost` points or hits a
+    resource limit, grows back while queries stay cheap. Each query reserves the
+    cost of the previous one from the client's GraphQL budget, which outlives the
+    batcher, so it goes to a token that can still pay for it and, once none can,
+    sleeps until the earliest reset.
+
+    Args:
+        client (GitHubClient): The client whose session and token are used.
+        batch_size (int, optional): Initial number of objects per query. Defaults to 25.
+        max_batch_size (int, optional): Upper bound for the batch size. Defaults to 100.
+        max_cost (int, optional): Target rate-limit cost per query. Defaults to 5.
+    """
+
+    def __init__(self, client: GitHubClient, batch_size: int = 25, max_batch_size: int = 100, max_cost: int = 5):
+        self.client = client
+        self.batch_size = batch_size
+        self.max_batch_size = max_batch_size
+        self.max_cost = max_cost
+        self.rate_limiter = client.graphql_rate_limiter
+        self.queries = 0
+        self.total_cost = 0
+        self.last_cost = 1
+
+    def execute(self, query: str) -> Tuple[Optional[dict], List[dict]]:
+        """
+        Runs one GraphQL query.
+
+        Args:
+            query (str): The query document.
+
+        Returns:
+            Tuple[Optional[dict], List[dict]]: The 'data' payload (None if the request failed) and the errors.
+        """
+        try:
+            response = self.client.request("POST", "graphql", json={"query": query}, rate_limiter=self.rate_limiter,
+                                           cost=self.last_cost)
+        except requests.RequestException as e:
+            logging.warning(f"GraphQL request failed: {e}")
+            return None, []
+        if response.status_code != 200:
+            logging.warning(f"GraphQL request failed with status {response.status_code}")
+            return None, []
+        payload = response.json()
+        self.queries += 1
+        return payload.get("data"), payload.get("errors") or []
+
+    def _adjust_batch_size(self, rate_limit: Optional[dict]) -> None:
+        if not rate_limit:
+            return
+        cost = rate_limit.get("cost", 1)
+        self.total_cost += cost
+        self.last_cost = max(1, cost)
+        if cost > self.max_cost:
+            self.batch_size = max(1, self.batch_size * self.max_cost // cost)
+        elif cost < self.max_cost:
+            self.batch_size = min(self.max_batch_size, self.batch_size + max(1, self.batch_size // 2))
+
+    def _fetch(self, pairs: Iterable[Tuple[str, int]], field: str, fields: str) -> Dict[Tuple[str, int], Optional[dict]]:
+        pending = list(dict.fromkeys((repo_name, int(number)) for repo_name, number in pairs))
+        results = {}
+        while pending:
+            batch, rest = pending[:self.batch_size], pending[self.batch_size:]
+            by_repo = {}
+            for repo_name, number in batch:
+                by_repo.setdefault(repo_name, []).append(number)
+
+            parts = []
+            for i, (repo_name, numbers) in enumerate(by_repo.items()):
+                owner, name = repo_name.split("/", 1)
+                inner = " ".join(f"n{number}: {field}(number: {number}) {{ {fields} }}" for number in numbers)
+                parts.append(f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{ {inner} }}")
+            data, errors = self.execute("query { rateLimit { cost remaining resetAt } " + " ".join(parts) + " }")
+
+            if data is None:
+                if len(batch) == 1:
+                    logging.warning(f"GraphQL lookup of {batch[0]} failed, leaving it to REST")
+                    pending = rest
+                else:
+                    self.batch_size = max(1, len(batch) // 2)
+                continue
+            if any(error.get("type") in ("MAX_NODE_LIMIT_EXCEEDED", "RESOURCE_LIMITS_EXCEEDED") for error in errors):
+                self.batch_size = max(1, len(batch) // 2)
+                if len(batch) > 1:
+                    continue
+
+            for i, (repo_name, numbers) in enumerate(by_repo.items()):
+                repository = data.get(f"r{i}") or {}
+                for number in numbers:
+                    if f"n{number}" in repository:
+                        results[(repo_name, number)] = repository[f"n{number}"]
+            self._adjust_batch_size(data.get("rateLimit"))
+            pending = rest
+        return results
+
+    def fetch_pulls(self, pairs: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], Optional[dict]]:
+        """
+        Fetches PRs with their closing issue references.
+
+        Args:
+            pairs (Iterable[Tuple[str, int]]): (repository, PR number) pairs.
+
+        Returns:
+            Dict[Tuple[str, int], Optional[dict]]: Raw GraphQL PR nodes (None if the PR does not exist).
+                Pairs whose query failed are absent.
+        """
+        return self._fetch(pairs, "pullRequest", PULL_FIELDS)
+
+    def fetch_issues(self, pairs: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], Optional[dict]]:
+        """
+        Fetches issues (or PRs referenced as issues) by number.
+
+        Args:
+            pairs (Iterable[Tuple[str, int]]): (repository, issue number) pairs.
+
+        Returns:
+            Dict[Tuple[str, int], Optional[dict]]: Raw GraphQL nodes, as in `fetch_pulls`.
+        """
+        return self._fetch(pairs, "issueOrPullRequest", ISSUE_FIELDS)
+
+    def prime_pulls(self, pairs: Iterable[Tuple[str, int]]) -> int:
+        """
+        Fetches PRs not yet known to the client and their closing issues and seeds them into its resource table,
+        so `get_pr_dates`, `get_linked_issues` and `get_issue_details` answer without REST calls.
+
+        Args:
+            pairs (Iterable[Tuple[str, int]]): (repository, PR number) pairs.
+
+        Returns:
+            int: The number of resources seeded.
+        """
+        missing = [(repo_name, number) for repo_name, number in pairs if not self.client.has(repo_name, "pulls", number)]
+        seeded = 0
+        for (repo_name, number), node in self.fetch_pulls(missing).items():
+            if node is None:
+                continue
+            self.client.prime(repo_name, "pulls", number, to_rest_shape(node))
+            seeded += 1
+            for issue in (node.get("closingIssuesReferences") or {}).get("nodes") or []:
+                # Closing references may point into other repositories; seed each under its own
+                issue_repo = (issue.get("repository") or {}).get("nameWithOwner")
+                if issue_repo:
+                    self.client.prime(issue_repo, "issues", issue["number"], to_rest_shape(issue))
+                    seeded += 1
+        return seeded
+
+    def prime_issues(self, pairs: Iterable[Tuple[str, int]]) -> int:
+        """
+        Fetches issues not yet known to the client and seeds them into its resource table.
+
+        Args:
+            pairs (Iterable[Tuple[str, int]]): (repository, issue number) pairs.
+
+        Returns:
+            int: The number of resources seeded.
+        """
+        missing = [(repo_name, number) for repo_name, number in pairs if not self.client.has(repo_name, "issues", number)]
+        seeded = 0
+        for (repo_name, number), node in self.fetch_issues(missing).items():
+            if node:
+                self.client.prime(repo_name, "issues", number, to_rest_shape(node))
+                seeded += 1
+        return seeded
@@ -0,0 +1,94 @@
+import logging
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from github_client import GitHubClient
+
+
+class ListingPrefetcher:
+    """
+    Seeds the client with PRs and issues from GitHub's paginated list endpoints, 100 per request.
+
+    `/repos/{repo}/pulls?state=closed` and `/repos/{repo}/issues?state=all&since=`
+    are paged newest-updated first and every listed object is primed into the
+    client under its number, so `get_pr_dates`, `get_linked_issues` and
+    `get_issue_details` answer from memory and only the misses cost a GET.
+
+    Listing a repository stops as soon as all wanted numbers were seen, once the
+    PRs are older than the crawl window, or once the pages fetched outnumber the
+    wanted objects they contained by more than one, so a sparse window never
+    costs much more than the per-number GETs it replaces.
+
+    Args:
+        client (GitHubClient): The client to seed and to send the list requests with.
+        per_page (int, optional): Objects per page, at most 100. Defaults to 100.
+    """
+
+    def __init__(self, client: GitHubClient, per_page: int = 100):
+        self.client = client
+        self.per_page = per_page
+        self.pages = 0
+        self.seeded = 0
+
+    def _list(self, repo_name: str, kind: str, wanted: Set[int], since: Optional[str]) -> int:
+        query = "state=closed" if kind == "pulls" else "state=all"
+        if kind == "issues" and since:
+            query += f"&since={since}"
+        found, page = 0, 0
+        while wanted and page <= found + 1:
+            page += 1
+            status, items = self.client.get_json(
+                f"repos/{repo_name}/{kind}?{query}&sort=updated&direction=desc&per_page={self.per_page}&page={page}")
+            if status != 200 or not isinstance(items, list):
+                logging.warning(f"Listing {kind} of {repo_name} failed on page {page} with status {status}")
+                break
+            self.pages += 1
+            for item in items:
+                self.client.prime(repo_name, kind, item["number"], item)
+                self.seeded += 1
+                if item["number"] in wanted:
+                    wanted.discard(item["number"])
+                    found += 1
+            if len(items) < self.per_page or (since and items[-1].get("updated_at", "") < since):
+                break
+        return found
+
+    def _prime(self, pairs: Iterable[Tuple[str, int]], kind: str, since: Dict[str, Optional[str]]) -> int:
+        by_repo: Dict[str, Set[int]] = {}
+        for repo_name, number in pairs:
+            if not self.client.has(repo_name, kind, number):
+                by_repo.setdefault(repo_name, set()).add(int(number))
+        found = 0
+        for repo_name, wanted in by_repo.items():
+            count = len(wanted)
+            hits = self._list(repo_name, kind, wanted, since.get(repo_name))
+            logging.info(f"Listing prefetch: {hits} of {count} {kind} of {repo_name} found")
+            found += hits
+        return found
+
+    def prime_pulls(self, pairs: Iterable[Tuple[str, int]], since: Optional[Dict[str, Optional[str]]] = None) -> int:
+        """
+        Lists closed PRs of each repository until the wanted ones are seeded.
+
+        Args:
+            pairs (Iterable[Tuple[str, int]]): Wanted (repository, PR number) pairs.
+            since (Optional[Dict[str, Optional[str]]], optional): ISO 8601 start of the crawl window by
+                repository; PRs last updated before it are not listed. Defaults to no bound.
+
+        Returns:
+            int: The number of wanted PRs found in the listings.
+        """
+        return self._prime(pairs, "pulls", since or {})
+
+    def prime_issues(self, pairs: Iterable[Tuple[str, int]], since: Optional[Dict[str, Optional[str]]] = None) -> int:
+        """
+        Lists issues (and PRs, which the issues endpoint includes) updated since the window start.
+
+        Args:
+            pairs (Iterable[Tuple[str, int]]): Wanted (repository, issue number) pairs.
+            since (Optional[Dict[str, Optional[str]]], optional): ISO 8601 start of the crawl window by
+                repository. Defaults to no bound.
+
+        Returns:
+            int: The number of wanted issues found in the listings.
+        """
+        return self._prime(pairs, "issues", since or {})
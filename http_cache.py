@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of GitHub API responses for conditional requests.
+
+    Each entry keeps the body together with its `ETag`/`Last-Modified`
+    validators, so a rerun can revalidate with `If-None-Match` and get a 304
+    (free of rate-limit cost) for everything that did not change. The database
+    is opened on first use, so an unused cache creates no file.
+
+    Args:
+        path (str, optional): The SQLite database file. Defaults to "github_cache.sqlite".
+        max_age (float, optional): Seconds an entry is served without revalidation. Defaults to 0.
+        ttl (float, optional): Seconds since last use after which an entry is evicted. Defaults to 30 days.
+        max_bytes (int, optional): Size cap for stored bodies; least recently used entries go first.
+            Defaults to 1 GiB.
+    """
+
+    def __init__(self, path: str = "github_cache.sqlite", max_age: float = 0, ttl: float = 30 * 24 * 3600,
+                 max_bytes: int = 1 << 30):
+        self.path = path
+        self.max_age = max_age
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        # Callers hold _lock. The database is opened (and expired entries evicted) on first use,
+        # so constructing a cache, e.g. at import time, creates no file.
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body TEXT NOT NULL,"
+                " size INTEGER NOT NULL, fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            self._conn.commit()
+            self._evict()
+        return self._conn
+
+    def get(self, url: str) -> Optional[Dict[str, object]]:
+        """
+        Looks up a cached response.
+
+        Args:
+            url (str): The request URL.
+
+        Returns:
+            Optional[Dict[str, object]]: The entry with 'etag', 'last_modified', 'body' and 'fresh'
+                (True when it may be used without revalidation), or None.
+        """
+        with self._lock:
+            row = self._db().execute(
+                "SELECT etag, last_modified, body, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, body, fetched_at = row
+        return {'etag': etag, 'last_modified': last_modified, 'body': body,
+                'fresh': time.time() - fetched_at < self.max_age}
+
+    def put(self, url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """
+        Stores a 200 response.
+
+        Args:
+            url (str): The request URL.
+            body (str): The response text.
+            etag (Optional[str], optional): The `ETag` header. Defaults to None.
+            last_modified (Optional[str], optional): The `Last-Modified` header. Defaults to None.
+        """
+        now = time.time()
+        size = len(body.encode())
+        with self._lock:
+            previous = self._db().execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, size, now, now)
+            )
+            self._conn.commit()
+            self._size += size - (previous[0] if previous else 0)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def touch(self, url: str) -> None:
+        """Marks an entry as just revalidated (after a 304)."""
+        now = time.time()
+        with self._lock:
+            self._db().execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            self._conn.commit()
+
+    def mark_used(self, url: str) -> None:
+        """Updates the LRU timestamp of an entry served from the cache."""
+        with self._lock:
+            self._db().execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def evict(self) -> None:
+        """Drops entries unused for longer than `ttl`, then least recently used ones until under `max_bytes`."""
+        with self._lock:
+            if self._conn is None:
+                self._db()
+            else:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Callers hold _lock.
+        self._conn.execute("DELETE FROM responses WHERE accessed_at < ?", (time.time() - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            urls, freed = [], 0
+            for url, size in self._conn.execute("SELECT url, size FROM responses ORDER BY accessed_at"):
+                if freed >= excess:
+                    break
+                urls.append((url,))
+                freed += size
+            self._conn.executemany("DELETE FROM responses WHERE url = ?", urls)
+            total -= freed
+        self._conn.commit()
+        self._size = total
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'revalidated': self.revalidated, 'misses': self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
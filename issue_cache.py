@@ -0,0 +1,115 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+IssueDetails = Tuple[str, str, str]
+
+
+class IssueCache:
+    """
+    Issue details `(open date, close date, description)` by `(repo, number)`, shared across rows and batches.
+
+    The in-memory layer is an LRU bounded by `max_entries`. With a `path`,
+    closed issues are also kept in SQLite, so a later run (or another process)
+    gets them without any request; open issues stay in memory only, since their
+    close date is still to come. The database is opened on first use, so a
+    cache built at import time creates no file.
+
+    Args:
+        max_entries (int, optional): Capacity of the in-memory LRU. Defaults to 100000.
+        path (Optional[str], optional): SQLite file for the persistent layer. Defaults to None (memory only).
+        ttl (float, optional): Seconds a persisted entry stays valid. Defaults to 30 days.
+    """
+
+    def __init__(self, max_entries: int = 100_000, path: Optional[str] = None, ttl: float = 30 * 24 * 3600):
+        self.max_entries = max_entries
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, int], IssueDetails]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        # Callers hold _lock. Opened (and expired entries dropped) on first use, see ResponseCache._db.
+        if self._conn is None and self.path:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS issues ("
+                " repo TEXT NOT NULL, number INTEGER NOT NULL, created_at TEXT, closed_at TEXT, body TEXT,"
+                " fetched_at REAL NOT NULL, PRIMARY KEY (repo, number))"
+            )
+            self._conn.execute("DELETE FROM issues WHERE fetched_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key: Tuple[str, int], details: IssueDetails) -> None:
+        self._entries[key] = details
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, repo_name: str, issue_number: int) -> Optional[IssueDetails]:
+        """
+        Looks up an issue in memory, then on disk.
+
+        Args:
+            repo_name (str): The GitHub repository name.
+            issue_number (int): The issue number.
+
+        Returns:
+            Optional[IssueDetails]: The details, or None on a miss.
+        """
+        key = (repo_name, int(issue_number))
+        with self._lock:
+            details = self._entries.get(key)
+            if details is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return details
+            conn = self._db()
+            if conn is not None:
+                row = conn.execute(
+                    "SELECT created_at, closed_at, body FROM issues WHERE repo = ? AND number = ?", key
+                ).fetchone()
+                if row is not None:
+                    details = tuple(row)
+                    self._remember(key, details)
+                    self.disk_hits += 1
+                    return details
+            self.misses += 1
+            return None
+
+    def put(self, repo_name: str, issue_number: int, details: IssueDetails) -> None:
+        """
+        Stores the details of a successfully fetched issue.
+
+        Args:
+            repo_name (str): The GitHub repository name.
+            issue_number (int): The issue number.
+            details (IssueDetails): Open date, close date and description.
+        """
+        key = (repo_name, int(issue_number))
+        with self._lock:
+            self._remember(key, tuple(details))
+            conn = self._db() if details[1] else None
+            if conn is not None:
+                conn.execute("INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?)", key + tuple(details) + (time.time(),))
+                conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'evictions': self.evictions, 'entries': len(self._entries)}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
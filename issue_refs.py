@@ -0,0 +1,141 @@
+import re
+from bisect import bisect_right
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+CLOSING_KEYWORDS = ("close", "closes", "closed", "fix", "fixes", "fixed", "resolve", "resolves", "resolved")
+# "Fixes #1234" is the example in many PR templates and never a real reference.
+EXCLUDED_ISSUES = frozenset({1234})
+
+# Texts of a batch are joined with this separator, which no pattern can match across.
+SEPARATOR = "\x00"
+
+# The `#N` and URL forms are scanned for separately, so each scan can skip ahead to
+# its literal prefix; the optional keyword and "owner/repo" before a `#N` hit are
+# then read with one anchored match of PREFIX_PATTERN against the reversed text
+# before it ("fixes owner/repo" reads "oper/renwo sexif").
+NUMBER_PATTERN = re.compile(r"\#(\d+)\b")
+URL_PATTERN = re.compile(r"https?://github\.com/([\w.-]+/[\w.-]+)/(?:issues|pull)/(\d+)\b")
+PREFIX_PATTERN = re.compile(r"""
+    (?P<repo>[\w.-]+/[\w.-]*[A-Za-z0-9])?
+    (?:\s*:?\s*\b(?P<keyword>%s)\b)?
+""" % "|".join(re.escape(keyword[::-1]) for keyword in sorted(CLOSING_KEYWORDS, key=len, reverse=True)),
+    re.IGNORECASE | re.VERBOSE)
+PREFIX_WINDOW = 128
+MERGE_PR_PATTERN = re.compile(r"Merge pull request \#(\d+)\b")
+
+
+class IssueRef(NamedTuple):
+    """
+    One `#N`, `owner/repo#N` or issue/PR URL reference found in a text.
+
+    Attributes:
+        number (int): The issue or PR number.
+        repo (Optional[str]): "owner/repo" for cross-repository references, else None.
+        keyword (Optional[str]): The closing keyword before it, lowercased (e.g. "fixes"), or None.
+    """
+    number: int
+    repo: Optional[str] = None
+    keyword: Optional[str] = None
+
+    @property
+    def closing(self) -> bool:
+        return self.keyword is not None
+
+
+def _join(texts: Sequence[Optional[str]]):
+    parts = [str(text).replace(SEPARATOR, " ") if text is not None else "" for text in texts]
+    starts, offset = [], 0
+    for part in parts:
+        starts.append(offset)
+        offset += len(part) + 1
+    return SEPARATOR.join(parts), starts
+
+
+def extract_refs_batch(texts: Sequence[Optional[str]]) -> List[List[IssueRef]]:
+    """
+    Finds all issue references in a batch of texts with a single pass of the compiled pattern.
+
+    Args:
+        texts (Sequence[Optional[str]]): Commit messages or PR bodies; None counts as empty.
+
+    Returns:
+        List[List[IssueRef]]: The references of each text, in order of appearance.
+    """
+    joined, starts = _join(texts)
+    found = []
+    for match in NUMBER_PATTERN.finditer(joined):
+        start = match.start()
+        index = bisect_right(starts, start) - 1
+        before = joined[max(starts[index], start - PREFIX_WINDOW):start][::-1]
+        prefix = PREFIX_PATTERN.match(before)
+        repo, keyword = prefix.group("repo"), prefix.group("keyword")
+        if repo is None and before and (before[0].isalnum() or before[0] in "_/#"):
+            continue
+        keyword_start = start - prefix.end() if keyword else start
+        found.append((keyword_start, index, IssueRef(int(match.group(1)), repo and repo[::-1], keyword and keyword[::-1].lower())))
+    for match in URL_PATTERN.finditer(joined):
+        start = match.start()
+        index = bisect_right(starts, start) - 1
+        before = joined[max(starts[index], start - PREFIX_WINDOW):start][::-1]
+        prefix = PREFIX_PATTERN.match(before)
+        if prefix.group("repo") is not None:
+            continue
+        keyword = prefix.group("keyword")
+        found.append((start, index, IssueRef(int(match.group(2)), match.group(1), keyword and keyword[::-1].lower())))
+    results: List[List[IssueRef]] = [[] for _ in texts]
+    for _, index, ref in sorted(found, key=lambda item: item[0]):
+        results[index].append(ref)
+    return results
+
+def extract_refs(text: Optional[str]) -> List[IssueRef]:
+    """Finds all issue references in one text, see `extract_refs_batch`."""
+    return extract_refs_batch([text])[0]
+
+
+def closing_issues_batch(texts: Sequence[Optional[str]], repo_names: Optional[Sequence[Optional[str]]] = None,
+                         exclude: Iterable[int] = EXCLUDED_ISSUES) -> List[List[int]]:
+    """
+    Extracts the issues each text closes ("fixes #12", "Resolved owner/repo#7", ...).
+
+    Args:
+        texts (Sequence[Optional[str]]): PR bodies or commit messages.
+        repo_names (Optional[Sequence[Optional[str]]], optional): The repository of each text; cross-repository
+            references to another repository are dropped. Defaults to keeping only same-repository references.
+        exclude (Iterable[int], optional): Numbers to ignore. Defaults to EXCLUDED_ISSUES.
+
+    Returns:
+        List[List[int]]: The unique closed issue numbers of each text, in order of appearance.
+    """
+    exclude = frozenset(exclude)
+    repo_names = repo_names if repo_names is not None else [None] * len(texts)
+    closed = []
+    for refs, repo_name in zip(extract_refs_batch(texts), repo_names):
+        numbers = (ref.number for ref in refs if ref.closing and ref.number not in exclude
+                   and (ref.repo is None or (repo_name is not None and ref.repo.lower() == repo_name.lower())))
+        closed.append(list(dict.fromkeys(numbers)))
+    return closed
+
+
+def pr_numbers_batch(messages: Sequence[Optional[str]]) -> List[Optional[int]]:
+    """
+    Extracts the PR number of each merge commit message.
+
+    "Merge pull request #N from ..." wins; otherwise the first same-repository
+    `#N` reference is used (e.g. the "(#N)" of a squash merge subject).
+
+    Args:
+        messages (Sequence[Optional[str]]): The commit messages.
+
+    Returns:
+        List[Optional[int]]: The PR number of each message, or None.
+    """
+    joined, starts = _join(messages)
+    numbers: List[Optional[int]] = [None] * len(messages)
+    for match in MERGE_PR_PATTERN.finditer(joined):
+        index = bisect_right(starts, match.start()) - 1
+        if match.start() == starts[index] and numbers[index] is None:
+            numbers[index] = int(match.group(1))
+    pending = [i for i, number in enumerate(numbers) if number is None and messages[i]]
+    for i, refs in zip(pending, extract_refs_batch([messages[i] for i in pending])):
+        numbers[i] = next((ref.number for ref in refs if ref.repo is None), None)
+    return numbers
@@ -0,0 +1,219 @@
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: mirrors are not shared between processes there
+    fcntl = None
+
+from commit_graph import write_commit_graph
+from pr_refs import PULL_REFSPECS
+
+CLONE_URL_TEMPLATE = "https://github.com/{repo_name}.git"
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class MirrorLease:
+    """
+    A shared hold on a mirror; the mirror is not evicted or fetched into while held.
+
+    Attributes:
+        path (str): The path to the bare mirror.
+    """
+
+    def __init__(self, path: str, lock_file):
+        self.path = path
+        self._lock_file = lock_file
+
+    def release(self) -> None:
+        if self._lock_file is not None:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class MirrorStore:
+    """
+    Local store of bare repository mirrors, reused across runs.
+
+    A mirror is cloned once and brought up to date with `git fetch` on every
+    later lease, so repeat crawls only transfer new history. Mirrors carry a
+    commit-graph with changed-path Bloom filters, extended by an incremental
+    layer after every fetch. When the store grows past `quota_bytes` after a
+    clone or fetch, the least recently leased mirrors that nobody holds are
+    deleted. Each mirror has two lock files, so batch workers in several
+    processes can share one store: `<name>.git.lock` is held exclusively while
+    the mirror is updated, evicted or leased, and `<name>.git.lease` is held
+    shared by every lease and exclusively while fetching. A lease is taken
+    before the update lock is released, so an eviction can never slip in
+    between a mirror's update and its lease.
+
+    Args:
+        base_path (str, optional): The directory holding the mirrors. Defaults to "mirrors".
+        quota_bytes (int, optional): Disk quota for all mirrors. Defaults to 50 GiB.
+        clone_options (Optional[List[str]], optional): Extra `git clone` arguments. Defaults to a blobless clone.
+        url_template (str, optional): The clone URL, formatted with `repo_name`. Defaults to CLONE_URL_TEMPLATE.
+        pull_refs (bool, optional): Also keep GitHub's `refs/pull/*/head` refs,
+            see `pr_refs.PullRequestIndex`. Defaults to False.
+        commit_graph (bool, optional): Maintain a commit-graph in each mirror. Defaults to True.
+    """
+
+    def __init__(self, base_path: str = "mirrors", quota_bytes: int = 50 << 30, clone_options: Optional[List[str]] = None,
+                 url_template: str = CLONE_URL_TEMPLATE, pull_refs: bool = False, commit_graph: bool = True):
+        self.base_path = base_path
+        self.pull_refs = pull_refs
+        self.commit_graph = commit_graph
+        self.url_template = url_template
+        self.quota_bytes = quota_bytes
+        self.clone_options = ["--filter=blob:none"] if clone_options is None else clone_options
+        self._evict_lock = threading.Lock()
+        self._sizes: Dict[str, Tuple[float, int]] = {}
+
+    def path_for(self, repo_name: str) -> str:
+        return os.path.join(self.base_path, f"{repo_name}.git")
+
+    def _open_lock(self, path: str, suffix: str = ".lock"):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open(f"{path}{suffix}", "a+")
+
+    def update(self, repo_name: str, path: str) -> bool:
+        """
+        Clones the mirror if it is missing, otherwise fetches new history. The caller holds both locks exclusively.
+
+        Args:
+            repo_name (str): The GitHub repository name.
+            path (str): The mirror path.
+
+        Returns:
+            bool: True if the mirror is usable.
+        """
+        try:
+            created = not os.path.exists(path)
+            if created:
+                repo_url = self.url_template.format(repo_name=repo_name)
+                logging.info(f"Creating mirror of {repo_url} at {path}")
+                subprocess.run(["git", "clone", "--bare"] + self.clone_options + [repo_url, path], check=True)
+                subprocess.run(["git", "-C", path, "config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*"], check=True)
+                if self.pull_refs:
+                    subprocess.run(["git", "-C", path, "fetch", "--quiet", "origin"] + PULL_REFSPECS, check=True)
+            else:
+                logging.info(f"Fetching updates into mirror {path}")
+                refspecs = ["+refs/heads/*:refs/heads/*"] + PULL_REFSPECS if self.pull_refs else []
+                subprocess.run(["git", "-C", path, "fetch", "--quiet", "--prune", "--tags", "origin"] + refspecs, check=True)
+            if self.commit_graph:
+                write_commit_graph(path, split=not created)
+        except subprocess.CalledProcessError:
+            logging.error(f"Failed to update mirror of {repo_name}")
+            return os.path.exists(path)
+        return True
+
+    def acquire(self, repo_name: str, refresh: bool = True) -> Optional[MirrorLease]:
+        """
+        Makes sure the mirror exists and is current, then holds it shared.
+
+        Args:
+            repo_name (str): The GitHub repository name.
+            refresh (bool, optional): Fetch new history if the mirror exists. Defaults to True.
+
+        Returns:
+            Optional[MirrorLease]: The lease, or None if the mirror could not be created.
+        """
+        path = self.path_for(repo_name)
+        lock_file = self._open_lock(path)
+        lease_file = self._open_lock(path, ".lease")
+        updated = refresh or not os.path.exists(path)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            ok = True
+            if updated:
+                if fcntl is not None:
+                    # Waits for current leases to end; converting back to shared is safe
+                    # because evictions and other acquires need the update lock first.
+                    fcntl.flock(lease_file, fcntl.LOCK_EX)
+                ok = self.update(repo_name, path)
+            if fcntl is not None:
+                fcntl.flock(lease_file, fcntl.LOCK_SH)
+            os.utime(lock_file.name)
+        except BaseException:
+            lease_file.close()
+            raise
+        finally:
+            lock_file.close()
+        lease = MirrorLease(path, lease_file)
+        if not ok:
+            lease.release()
+            return None
+        if updated:
+            self.evict()
+        return lease
+
+    @contextmanager
+    def lease(self, repo_name: str, refresh: bool = True) -> Iterator[Optional[str]]:
+        """Context manager around `acquire`, yielding the mirror path (or None)."""
+        lease = self.acquire(repo_name, refresh)
+        try:
+            yield lease.path if lease is not None else None
+        finally:
+            if lease is not None:
+                lease.release()
+
+    def mirrors(self) -> List[Tuple[float, str]]:
+        """Lists (last lease time, path) for every mirror in the store, oldest first."""
+        found = []
+        for root, dirs, _ in os.walk(self.base_path):
+            for name in list(dirs):
+                if name.endswith(".git"):
+                    path = os.path.join(root, name)
+                    stamp = f"{path}.lock"
+                    found.append((os.path.getmtime(stamp) if os.path.exists(stamp) else 0.0, path))
+                    dirs.remove(name)
+        return sorted(found)
+
+    def _size(self, stamp: float, path: str) -> int:
+        # The lock file is touched on every lease, so a mirror is measured again only if it was used since.
+        cached = self._sizes.get(path)
+        if cached is None or cached[0] != stamp:
+            cached = self._sizes[path] = (stamp, _directory_size(path))
+        return cached[1]
+
+    def evict(self) -> None:
+        """Deletes least recently leased, unheld mirrors until the store fits in `quota_bytes`."""
+        with self._evict_lock:
+            mirrors = [(path, self._size(stamp, path)) for stamp, path in self.mirrors()]
+            total = sum(size for _, size in mirrors)
+            for path, size in mirrors:
+                if total <= self.quota_bytes:
+                    break
+                lock_file = self._open_lock(path)
+                lease_file = self._open_lock(path, ".lease")
+                try:
+                    if fcntl is not None:
+                        try:
+                            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                            fcntl.flock(lease_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        except BlockingIOError:
+                            continue
+                    logging.info(f"Evicting mirror {path} ({size} bytes) to stay under quota")
+                    shutil.rmtree(path, ignore_errors=True)
+                    self._sizes.pop(path, None)
+                    total -= size
+                finally:
+                    lease_file.close()
+                    lock_file.close()
@@ -0,0 +1,271 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import shutil
+from typing import List, Optional, Set
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from arrow_schema import read_dataframe, to_table
+
+
+def prepare_csv(filename: str, columns: List[str]) -> int:
+    """
+    Makes sure a CSV header has all of `columns`, for appending rows with them.
+
+    Only the header is read; when it lacks some of the columns (in practice, once,
+    after `initialize_csv`) the file is rewritten atomically with them added at
+    the end, the way `pd.concat` would align them.
+
+    Args:
+        filename (str): The CSV file.
+        columns (List[str]): The columns of the rows to append.
+
+    Returns:
+        int: The size of the file, i.e. the offset the appended rows will start at.
+    """
+    if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+        return 0
+    header = list(pd.read_csv(filename, nrows=0).columns)
+    new_columns = [column for column in columns if column not in header]
+    if new_columns:
+        logging.info(f"New columns {new_columns} for {filename}, rewriting it once")
+        temp_filename = os.path.join(os.path.dirname(os.path.abspath(filename)), f".{os.path.basename(filename)}.tmp")
+        pd.read_csv(filename).reindex(columns=header + new_columns).to_csv(temp_filename, index=False)
+        os.replace(temp_filename, filename)
+    return os.path.getsize(filename)
+
+
+def append_csv(df: pd.DataFrame, filename: str, offset: Optional[int] = None) -> None:
+    """
+    Appends rows to a CSV file without reading it back.
+
+    Only the header is read, see `prepare_csv`. With an `offset` from
+    `prepare_csv`, anything past it is cut off first, so retrying an
+    interrupted append of the same rows does not duplicate them.
+
+    Args:
+        df (pd.DataFrame): The rows to append.
+        filename (str): The CSV file.
+        offset (Optional[int], optional): Where the rows start. Defaults to the end of the file.
+    """
+    if offset is not None and os.path.exists(filename) and os.path.getsize(filename) > offset:
+        logging.info(f"Dropping {os.path.getsize(filename) - offset} bytes of an interrupted append to {filename}")
+        os.truncate(filename, offset)
+    if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+        df.to_csv(filename, index=False)
+        return
+    prepare_csv(filename, list(df.columns))
+    header = list(pd.read_csv(filename, nrows=0).columns)
+    df.reindex(columns=header).to_csv(filename, mode='a', header=False, index=False)
+
+
+class PartitionedSink:
+    """
+    A dataset stored as a directory of part files, one per appended batch.
+
+    Appending writes a new part in time proportional to the batch; `read`
+    presents all parts as one DataFrame and `compact` merges them.
+
+    A compaction is recorded in a `.compaction` journal naming the merged part
+    and the parts it replaces. Once the merged part exists, the replaced ones
+    are no longer listed by `parts`, so a crash before they are deleted never
+    shows their rows twice; the next `compact` finishes the deletion.
+
+    Args:
+        path (str): The dataset directory.
+        fmt (str, optional): "parquet" (needs pyarrow) or "csv". Defaults to "parquet".
+        schema (Optional[pa.Schema], optional): Write Parquet parts with this typed schema, e.g.
+            EXPLODED_SCHEMA, so list and date cells are stored natively. Defaults to None.
+    """
+
+    def __init__(self, path: str, fmt: str = "parquet", schema: Optional[pa.Schema] = None):
+        self.path = path
+        self.fmt = fmt
+        self.schema = schema
+        os.makedirs(path, exist_ok=True)
+
+    def parts(self) -> List[str]:
+        """Lists the part files in append order."""
+        parts = sorted(glob.glob(os.path.join(self.path, f"part-*.{self.fmt}")))
+        replaced = self._replaced_parts()
+        return [part for part in parts if os.path.basename(part) not in replaced] if replaced else parts
+
+    def _journal(self) -> str:
+        return os.path.join(self.path, ".compaction")
+
+    def _read_journal(self) -> Optional[dict]:
+        try:
+            with open(self._journal()) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _replaced_parts(self) -> Set[str]:
+        # Parts superseded by a published compaction whose cleanup did not finish
+        journal = self._read_journal()
+        if journal is None:
+            return set()
+        if not os.path.exists(os.path.join(self.path, journal["part"])):
+            return set()  # interrupted before the merged part was published: the old parts are current
+        return set(journal["replaces"])
+
+    def _finish_compaction(self) -> None:
+        for name in self._replaced_parts():
+            try:
+                os.remove(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+        if os.path.exists(self._journal()):
+            os.remove(self._journal())
+
+    def _write(self, df: pd.DataFrame, filename: str) -> None:
+        temp_filename = os.path.join(self.path, f".{os.path.basename(filename)}.tmp")
+        if self.fmt == "parquet" and self.schema is not None:
+            pq.write_table(to_table(df, self.schema), temp_filename)
+        elif self.fmt == "parquet":
+            df.to_parquet(temp_filename, index=False)
+        else:
+            df.to_csv(temp_filename, index=False)
+        os.replace(temp_filename, filename)
+
+    def next_number(self) -> int:
+        """Returns the number the next appended part gets."""
+        names = [os.path.basename(part) for part in self.parts()]
+        journal = self._read_journal()
+        if journal is not None:
+            names.append(journal["part"])  # never reuse the number of an unfinished compaction
+        return max(int(name.split("-")[1].split(".")[0]) for name in names) + 1 if names else 0
+
+    def append(self, df: pd.DataFrame, number: Optional[int] = None) -> str:
+        """
+        Writes a batch as a new part; the part appears atomically.
+
+        Args:
+            df (pd.DataFrame): The batch.
+            number (Optional[int], optional): The part number, reserved with `next_number` before the
+                batch was prepared. A retried batch then replaces its earlier part instead of being
+                appended twice. Defaults to the next number.
+
+        Returns:
+            str: The path of the new part.
+        """
+        number = self.next_number() if number is None else number
+        filename = os.path.join(self.path, f"part-{number:06d}.{self.fmt}")
+        self._write(df, filename)
+        logging.info(f"Wrote {len(df)} rows to {filename}")
+        return filename
+
+    def read(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Reads all parts as one DataFrame.
+
+        Args:
+            columns (Optional[List[str]], optional): Columns to load. Defaults to all.
+
+        Returns:
+            pd.DataFrame: The concatenated parts.
+        """
+        if self.fmt == "parquet" and self.schema is not None:
+            return read_dataframe(self.parts(), columns) if self.parts() else pd.DataFrame(columns=columns)
+        frames = [pd.read_parquet(part, columns=columns) if self.fmt == "parquet" else pd.read_csv(part, usecols=columns)
+                  for part in self.parts()]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+    def count(self) -> int:
+        """Returns the number of rows in all parts (from Parquet metadata, or by scanning CSV parts)."""
+        if self.fmt == "parquet":
+            return sum(pq.ParquetFile(part).metadata.num_rows for part in self.parts())
+        return sum(len(chunk) for part in self.parts() for chunk in pd.read_csv(part, usecols=[0], chunksize=100_000))
+
+    def export(self, filename: str, parts: Optional[List[str]] = None) -> None:
+        """
+        Writes all parts, in order, to a single file that replaces `filename` atomically.
+
+        Parts are streamed one at a time (CSV text is copied, Parquet parts become row
+        groups), so memory is bounded by the largest part.
+
+        Args:
+            filename (str): The output file, in the sink's format.
+            parts (Optional[List[str]], optional): The parts to write. Defaults to all.
+        """
+        temp_filename = os.path.join(os.path.dirname(os.path.abspath(filename)), f".{os.path.basename(filename)}.tmp")
+        parts = self.parts() if parts is None else parts
+        if self.fmt == "parquet":
+            schema = self.schema or (pq.read_schema(parts[0]) if parts else pa.schema([]))
+            with pq.ParquetWriter(temp_filename, schema) as writer:
+                for part in parts:
+                    writer.write_table(pq.read_table(part, memory_map=True).cast(schema))
+        else:
+            with open(temp_filename, "w", newline="") as out:
+                for i, part in enumerate(parts):
+                    with open(part, newline="") as f:
+                        header = f.readline()
+                        if i == 0:
+                            out.write(header)
+                        shutil.copyfileobj(f, out)
+        os.replace(temp_filename, filename)
+        logging.info(f"Exported {len(parts)} parts of {self.path} to {filename}")
+
+    def compact(self) -> Optional[str]:
+        """
+        Merges all parts into a single new part, streamed like `export`.
+
+        The merged part gets the next part number and is published atomically
+        after the journal names the parts it replaces; only then are those
+        deleted. Do not compact while a crawl is appending to the dataset.
+
+        Returns:
+            Optional[str]: The path of the compacted part, or None if there was nothing to merge.
+        """
+        self._finish_compaction()
+        parts = self.parts()
+        if len(parts) < 2:
+            return parts[0] if parts else None
+        filename = os.path.join(self.path, f"part-{self.next_number():06d}.{self.fmt}")
+        journal = {"part": os.path.basename(filename), "replaces": [os.path.basename(part) for part in parts]}
+        temp_journal = f"{self._journal()}.tmp"
+        with open(temp_journal, "w") as f:
+            json.dump(journal, f)
+        os.replace(temp_journal, self._journal())
+        self.export(filename, parts)
+        self._finish_compaction()
+        logging.info(f"Compacted {len(parts)} parts into {filename}")
+        return filename
+
+
+def read_dataset(path: str) -> pd.DataFrame:
+    """
+    Reads scraper output: a `PartitionedSink` directory, a Parquet file or a CSV file.
+
+    Args:
+        path (str): The output path.
+
+    Returns:
+        pd.DataFrame: The rows.
+    """
+    if os.path.isdir(path):
+        fmt = "parquet" if glob.glob(os.path.join(path, "part-*.parquet")) else "csv"
+        return PartitionedSink(path, fmt).read()
+    if path.endswith(".parquet"):
+        return read_dataframe(path)
+    return pd.read_csv(path)
+
+
+def main() -> None:
+    """Command line entry point: `python output_sink.py compact <dataset dir>`."""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Maintain partitioned scraper output")
+    parser.add_argument("command", choices=["compact"])
+    parser.add_argument("path")
+    parser.add_argument("--format", default="parquet", choices=["parquet", "csv"])
+    args = parser.parse_args()
+    PartitionedSink(args.path, args.format).compact()
+
+
+if __name__ == '__main__':
+    main()
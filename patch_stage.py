@@ -0,0 +1,130 @@
+import argparse
+import logging
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from draft_git_scraper_v02 import stream_git_diff
+from mirror_store import MirrorLease, MirrorStore
+from patch_store import PatchStore
+from path_classifier import TestFileClassifier
+
+PATCH_COLUMNS = ["full_patch", "patch", "test_patch"]
+
+
+def _resolve_repo(repo_name: str, repo_paths: Dict[str, str], mirror_store: Optional[MirrorStore],
+                  base_path: str) -> Tuple[Optional[str], Optional[MirrorLease]]:
+    if repo_name in repo_paths:
+        return repo_paths[repo_name], None
+    if mirror_store is not None:
+        lease = mirror_store.acquire(repo_name)
+        return (lease.path, lease) if lease is not None else (None, None)
+    repo_path = os.path.join(base_path, repo_name)
+    if os.path.exists(repo_path):
+        return repo_path, None
+    logging.error(f"No local copy of {repo_name} in {base_path}; pass repo_paths or a mirror_store")
+    return None, None
+
+
+def materialize_patches(df: pd.DataFrame, before_column: str = "base_commit", after_column: str = "resolving_commit_id",
+                        repo_column: str = "repo_name", repo_paths: Optional[Dict[str, str]] = None,
+                        mirror_store: Optional[MirrorStore] = None, base_path: str = "repos", workers: int = 8,
+                        use_testpaths: bool = False, store: Optional[PatchStore] = None, **split_options) -> pd.DataFrame:
+    """
+    Adds `full_patch`, `patch` and `test_patch` columns for every (before, after) commit pair.
+
+    Rows are grouped by repository: each repository is resolved once (a path,
+    a leased mirror or a directory under `base_path`) and gets one test-file
+    classifier built from its pytest configuration. Every distinct (repository,
+    before, after) triple is diffed once on a shared thread pool with
+    `stream_git_diff`, and the results are joined back onto the rows in one
+    merge instead of per-row assignments.
+
+    Args:
+        df (pd.DataFrame): The exploded dataset.
+        before_column (str, optional): The column with the older commit. Defaults to "base_commit".
+        after_column (str, optional): The column with the newer commit. Defaults to "resolving_commit_id".
+        repo_column (str, optional): The column with the repository name. Defaults to "repo_name".
+        repo_paths (Optional[Dict[str, str]], optional): Local paths by repository name. Defaults to None.
+        mirror_store (Optional[MirrorStore], optional): Lease repositories missing from `repo_paths`
+            from this store. Defaults to None.
+        base_path (str, optional): Otherwise look for `<base_path>/<repo_name>`. Defaults to "repos".
+        workers (int, optional): Number of concurrent `git diff` processes. Defaults to 8.
+        use_testpaths (bool, optional): Also look for test modules below each repository's pytest `testpaths`,
+            see `TestFileClassifier`. Defaults to False.
+        store (Optional[PatchStore], optional): Keep the texts in this content-addressed store and give
+            the rows `full_patch_id`, `patch_id` and `test_patch_id` columns instead. Defaults to None.
+        **split_options: `DiffSplitter` options such as `max_file_bytes`, `max_total_bytes`, `skip_binary`.
+
+    Returns:
+        pd.DataFrame: A copy of `df` with the three patch (or patch ID) columns, None where the diff failed.
+    """
+    repo_paths = repo_paths or {}
+    keys = [repo_column, before_column, after_column]
+    pairs = df[keys].dropna().drop_duplicates()
+    repos = list(pairs[repo_column].unique())
+    logging.info(f"Materializing patches: {len(df)} rows, {len(pairs)} distinct commit pairs in {len(repos)} repos")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_resolve_repo, repo, repo_paths, mirror_store, base_path) for repo in repos]
+        try:
+            resolved = {repo: future.result() for repo, future in zip(repos, futures)}
+            classifiers = {repo: TestFileClassifier.from_repo(path, use_testpaths=use_testpaths)
+                           for repo, (path, _) in resolved.items() if path}
+
+            def diff(pair: Tuple[str, str, str]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+                repo, before, after = pair
+                path = resolved[repo][0]
+                if path is None:
+                    return None, None, None
+                try:
+                    return stream_git_diff(path, before, after, is_test=classifiers[repo].is_test_diff_header, **split_options)
+                except subprocess.CalledProcessError as e:
+                    logging.warning(f"git diff {before}..{after} failed in {repo}: {e.stderr.decode(errors='replace').strip()}")
+                    return None, None, None
+
+            results = list(executor.map(diff, pairs.itertuples(index=False, name=None)))
+        finally:
+            # Release every lease that was taken, even if resolving another repository failed
+            for future in futures:
+                future.cancel()
+            for future in futures:
+                if not future.cancelled() and future.exception() is None and future.result()[1] is not None:
+                    future.result()[1].release()
+
+    patches = pairs.reset_index(drop=True)
+    patches[PATCH_COLUMNS] = pd.DataFrame(results, columns=PATCH_COLUMNS, dtype=object)
+    if store is not None:
+        patches = store.dedupe(patches, PATCH_COLUMNS)
+    replaced = PATCH_COLUMNS + [f"{column}_id" for column in PATCH_COLUMNS]
+    result = df.drop(columns=[column for column in replaced if column in df.columns])
+    return result.merge(patches, on=keys, how="left").set_axis(df.index)
+
+
+def main() -> None:
+    """Command line entry point: `python patch_stage.py <exploded.parquet> <output.parquet> [--base-path repos]`."""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Add full_patch/patch/test_patch columns to an exploded dataset")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--base-path", default="repos")
+    parser.add_argument("--mirrors", help="Lease repositories from a mirror store at this path")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--max-file-bytes", type=int)
+    parser.add_argument("--max-total-bytes", type=int)
+    parser.add_argument("--patch-store", help="Write patch texts to a content-addressed store here, rows keep IDs")
+    args = parser.parse_args()
+
+    df = pd.read_parquet(args.input)
+    df = materialize_patches(df, base_path=args.base_path, mirror_store=MirrorStore(args.mirrors) if args.mirrors else None,
+                             workers=args.workers, store=PatchStore(args.patch_store) if args.patch_store else None,
+                             max_file_bytes=args.max_file_bytes, max_total_bytes=args.max_total_bytes)
+    df.to_parquet(args.output, index=False)
+    logging.info(f"Wrote {len(df)} rows with patches to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+import glob
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+STORE_SCHEMA = pa.schema([("id", pa.string()), ("text", pa.large_string())])
+
+
+def patch_id(text: Optional[str]) -> Optional[str]:
+    """Returns the content address of a patch (SHA-256 of its UTF-8 text), or None for a missing patch."""
+    if text is None or (isinstance(text, float) and pd.isna(text)):
+        return None
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+class PatchStore:
+    """
+    Content-addressed store of patch texts, kept as zstd-compressed Parquet parts.
+
+    Each distinct text is written once, keyed by `patch_id`; dataset rows keep
+    only the IDs, and texts are read back on demand (`store[id]`, `get_many`,
+    `hydrate`). Parts are sorted by ID with small row groups, so a lookup reads
+    only the row groups whose ID range can hold it. Recently read texts are
+    kept in a small LRU cache.
+
+    Several processes can write to one store: every part gets a unique name
+    (write time plus a random suffix), and parts written by others are
+    indexed as soon as they appear.
+
+    Args:
+        path (str, optional): The store directory. Defaults to "patch_store".
+        compression (str, optional): Parquet compression of the parts. Defaults to "zstd".
+        row_group_size (int, optional): Texts per row group. Defaults to 64.
+        cache_size (int, optional): Number of texts kept in memory after reading. Defaults to 256.
+    """
+
+    def __init__(self, path: str = "patch_store", compression: str = "zstd", row_group_size: int = 64,
+                 cache_size: int = 256):
+        self.path = path
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.cache_size = cache_size
+        self._index: Dict[str, str] = {}
+        self._indexed: Set[str] = set()
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def parts(self) -> List[str]:
+        """Lists the part files in write order."""
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def _load_index(self) -> Dict[str, str]:
+        # Callers hold _lock. Only parts not seen yet, e.g. written by another process, are read.
+        for part in self.parts():
+            if part not in self._indexed:
+                for key in pq.read_table(part, columns=["id"], memory_map=True).column("id").to_pylist():
+                    self._index.setdefault(key, part)
+                self._indexed.add(part)
+        return self._index
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._load_index()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load_index())
+
+    def put_many(self, texts: Iterable[Optional[str]]) -> List[Optional[str]]:
+        """
+        Stores texts that are not in the store yet, as one new part.
+
+        Args:
+            texts (Iterable[Optional[str]]): The patches; None stays None.
+
+        Returns:
+            List[Optional[str]]: The ID of each text, in order.
+        """
+        texts = list(texts)
+        ids = [patch_id(text) for text in texts]
+        with self._lock:
+            index = self._load_index()
+            new = {key: text for key, text in zip(ids, texts) if key is not None and key not in index}
+            if new:
+                name = f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:12]}.parquet"
+                filename = os.path.join(self.path, name)
+                temp_filename = os.path.join(self.path, f".{name}.tmp")
+                keys = sorted(new)
+                table = pa.Table.from_arrays([pa.array(keys, pa.string()), pa.array([new[key] for key in keys], pa.large_string())],
+                                             schema=STORE_SCHEMA)
+                pq.write_table(table, temp_filename, compression=self.compression, row_group_size=self.row_group_size)
+                os.replace(temp_filename, filename)
+                index.update((key, filename) for key in keys)
+                self._indexed.add(filename)
+                logging.info(f"Stored {len(keys)} new patches in {filename} ({len(texts) - len(keys)} already known or missing)")
+        return ids
+
+    def put(self, text: Optional[str]) -> Optional[str]:
+        """Stores one text and returns its ID."""
+        return self.put_many([text])[0]
+
+    def get_many(self, ids: Iterable[Optional[str]]) -> Dict[str, str]:
+        """
+        Reads texts by ID, one filtered read per part that holds any of them.
+
+        Args:
+            ids (Iterable[Optional[str]]): The IDs; None and unknown IDs are skipped.
+
+        Returns:
+            Dict[str, str]: The texts by ID.
+        """
+        found, by_part = {}, {}
+        with self._lock:
+            index = self._load_index()
+            for key in dict.fromkeys(ids):
+                if not isinstance(key, str):
+                    continue
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+                elif key in index:
+                    by_part.setdefault(index[key], []).append(key)
+        for part, keys in by_part.items():
+            table = pq.read_table(part, filters=[("id", "in", keys)], memory_map=True)
+            found.update(zip(table.column("id").to_pylist(), table.column("text").to_pylist()))
+        with self._lock:
+            for key in (key for keys in by_part.values() for key in keys if key in found):
+                self._cache[key] = found[key]
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return found
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        """Returns the text of an ID, or None if it is None or unknown."""
+        return self.get_many([key]).get(key) if key is not None else None
+
+    def __getitem__(self, key: str) -> str:
+        text = self.get(key)
+        if text is None:
+            raise KeyError(key)
+        return text
+
+    def dedupe(self, df: pd.DataFrame, columns: Iterable[str]) -> pd.DataFrame:
+        """
+        Moves text columns into the store, replacing each `<column>` by `<column>_id`.
+
+        Args:
+            df (pd.DataFrame): The rows.
+            columns (Iterable[str]): The text columns.
+
+        Returns:
+            pd.DataFrame: A copy of `df` carrying IDs instead of texts.
+        """
+        df = df.copy()
+        for column in columns:
+            position = df.columns.get_loc(column)
+            ids = self.put_many(df[column].tolist())
+            df = df.drop(columns=[column])
+            df.insert(position, f"{column}_id", pd.Series(ids, index=df.index, dtype=object))
+        return df
+
+    def hydrate(self, df: pd.DataFrame, columns: Iterable[str]) -> pd.DataFrame:
+        """
+        Adds the text back for `<column>_id` columns, e.g. for the rows about to be used.
+
+        Args:
+            df (pd.DataFrame): Rows carrying patch IDs.
+            columns (Iterable[str]): The text column names (without the `_id` suffix).
+
+        Returns:
+            pd.DataFrame: A copy of `df` with the text columns added.
+        """
+        df = df.copy()
+        for column in columns:
+            ids = df[f"{column}_id"].tolist()
+            texts = self.get_many(ids)
+            df[column] = pd.Series([texts.get(key) if key is not None else None for key in ids], index=df.index, dtype=object)
+        return df
@@ -0,0 +1,227 @@
+import configparser
+import logging
+import re
+import subprocess
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11: pyproject.toml testpaths are ignored
+    tomllib = None
+
+# Test modules as pytest collects them by default, plus anything under a test directory.
+DEFAULT_TEST_GLOBS = ("test_*.py", "*_test.py", "tests/", "test/", "conftest.py")
+DEFAULT_MODULE_GLOBS = ("test_*.py", "*_test.py")
+
+PYTEST_CONFIG_FILES = (
+    ("pytest.ini", "pytest"),
+    ("pyproject.toml", None),
+    ("tox.ini", "pytest"),
+    ("setup.cfg", "tool:pytest"),
+)
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translates a path glob to a regex matched against '/'-separated repository paths.
+
+    `*` and `?` stay within one path segment and `**` spans segments. As in
+    .gitignore, a pattern starting with '/' is anchored at the repository root,
+    any other pattern matches at every directory level, and a trailing '/'
+    matches everything below that directory.
+
+    Args:
+        pattern (str): The glob, e.g. "tests/", "test_*.py" or "/src/**/testing/*.py".
+
+    Returns:
+        str: The regex source.
+    """
+    anchored = pattern.startswith("/")
+    pattern = pattern.lstrip("/")
+    directory = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    parts, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return ("^" if anchored else "(?:^|/)") + "".join(parts) + ("/" if directory else "$")
+
+
+class TestFileClassifier:
+    """
+    Decides which repository paths are tests, with one precompiled regex.
+
+    All globs and regexes are folded into a single pattern and answers are
+    memoized per path, so classifying the same file
+    across many merges costs a dict lookup. The same instance serves the diff
+    splitter (`is_test_diff_header`) and changed-file filtering (`filter`,
+    `test_modules`), so both agree on what a test is.
+
+    `testpaths` only scope where test modules are looked for, as in pytest:
+    below each of them, files matching `module_globs` (and `conftest.py`) are
+    tests, but the directory itself is not. Projects often point `testpaths`
+    at their package (sympy uses `testpaths = sympy doc/src`), whose sources
+    must stay in the gold patch.
+
+    Args:
+        globs (Sequence[str], optional): Path globs, see `glob_to_regex`. Defaults to DEFAULT_TEST_GLOBS.
+        regexes (Sequence[str], optional): Extra regexes searched in the path. Defaults to none.
+        testpaths (Sequence[str], optional): Directories pytest collects from, relative to the repository
+            root (pytest's `testpaths`); only their test modules are tests. Defaults to none.
+        module_globs (Sequence[str], optional): Basenames pytest collects as test modules.
+            Defaults to DEFAULT_MODULE_GLOBS.
+        cache_size (int, optional): Number of memoized paths. Defaults to 2**16.
+    """
+    __test__ = False  # not a pytest test class
+
+    def __init__(self, globs: Sequence[str] = DEFAULT_TEST_GLOBS, regexes: Sequence[str] = (),
+                 testpaths: Sequence[str] = (), module_globs: Sequence[str] = DEFAULT_MODULE_GLOBS,
+                 cache_size: int = 1 << 16):
+        self.globs = tuple(globs)
+        self.regexes = tuple(regexes)
+        self.testpaths = tuple(path.strip("/") for path in testpaths if path.strip("/") not in ("", "."))
+        rules = [glob_to_regex(glob) for glob in self.globs] + list(self.regexes)
+        scoped = tuple(module_globs) + ("conftest.py",)
+        rules += [glob_to_regex(f"/{path}/**/{glob}") for path in self.testpaths for glob in scoped]
+        self._pattern = re.compile("|".join(f"(?:{rule})" for rule in rules) or r"(?!)")
+        self._module_pattern = re.compile("|".join(f"(?:{glob_to_regex(glob)})" for glob in module_globs) or r"(?!)")
+        self.is_test = lru_cache(maxsize=cache_size)(self._is_test)
+        self.is_test_module = lru_cache(maxsize=cache_size)(self._is_test_module)
+
+    def _is_test(self, path: str) -> bool:
+        return self._pattern.search(path.replace("\\", "/")) is not None
+
+    def _is_test_module(self, path: str) -> bool:
+        return self.is_test(path) and self._module_pattern.search(path.replace("\\", "/")) is not None
+
+    def filter(self, paths: Iterable[str]) -> List[str]:
+        """Returns the test paths, in order."""
+        return [path for path in paths if self.is_test(path)]
+
+    def split(self, paths: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """Returns (test paths, other paths), in order."""
+        tests, others = [], []
+        for path in paths:
+            (tests if self.is_test(path) else others).append(path)
+        return tests, others
+
+    def test_modules(self, paths: Iterable[str]) -> List[str]:
+        """Returns the test paths pytest would collect as modules (e.g. to build a test command)."""
+        return [path for path in paths if self.is_test_module(path)]
+
+    def is_test_diff_header(self, header: str) -> bool:
+        """
+        Classifies a `diff --git a/<old> b/<new>` section by its old and new paths.
+
+        Args:
+            header (str): The header line.
+
+        Returns:
+            bool: True if either path is a test.
+        """
+        return any(self.is_test(path) for path in parse_diff_header(header))
+
+    @classmethod
+    def from_repo(cls, repo_path: str, rev: str = "HEAD", use_testpaths: bool = False,
+                  use_conftest: bool = False, **kwargs) -> "TestFileClassifier":
+        """
+        Builds a classifier for one repository, reading its pytest configuration at `rev`.
+
+        Files are read with `git show`, so bare mirrors work too.
+
+        Args:
+            repo_path (str): The repository.
+            rev (str, optional): The revision whose configuration is read. Defaults to "HEAD".
+            use_testpaths (bool, optional): Also look for test modules below pytest's `testpaths`,
+                see the class docstring. Defaults to False.
+            use_conftest (bool, optional): Likewise below every directory under the root holding a
+                `conftest.py`. Defaults to False.
+            **kwargs: Other `TestFileClassifier` arguments.
+
+        Returns:
+            TestFileClassifier: The classifier.
+        """
+        testpaths = list(kwargs.pop("testpaths", ()))
+        if use_testpaths:
+            testpaths += read_pytest_testpaths(repo_path, rev)
+        if use_conftest:
+            files = _git(repo_path, ["ls-tree", "-r", "--name-only", rev]) or ""
+            testpaths += [path.rsplit("/", 1)[0] for path in files.splitlines() if path.endswith("/conftest.py")]
+        return cls(testpaths=testpaths, **kwargs)
+
+
+def parse_diff_header(header: str) -> List[str]:
+    """
+    Extracts the old and new paths from a `diff --git a/<old> b/<new>` line.
+
+    Args:
+        header (str): The header line.
+
+    Returns:
+        List[str]: The paths (one when both are equal, the raw remainder if the line cannot be split).
+    """
+    rest = header[len("diff --git "):].rstrip("\r\n") if header.startswith("diff --git ") else header.rstrip("\r\n")
+    if rest.startswith('"'):
+        return [part.strip('"')[2:] for part in re.findall(r'"(?:[^"\\]|\\.)*"|\S+', rest)]
+    # Unquoted paths may contain spaces; old and new are usually equal, so split in the middle.
+    if rest.startswith("a/") and len(rest) % 2 == 1:
+        old, new = rest[:len(rest) // 2], rest[len(rest) // 2 + 1:]
+        if new.startswith("b/") and old[2:] == new[2:]:
+            return [old[2:]]
+    match = re.match(r"a/(.*) b/(.*)$", rest)
+    return [match.group(1), match.group(2)] if match else [rest]
+
+
+def _git(repo_path: str, command: List[str]) -> Optional[str]:
+    result = subprocess.run(["git", "-C", repo_path] + command, capture_output=True, text=True)
+    return result.stdout if result.returncode == 0 else None
+
+
+def read_pytest_testpaths(repo_path: str, rev: str = "HEAD") -> List[str]:
+    """
+    Reads pytest's `testpaths` from the first configuration file pytest would use.
+
+    Args:
+        repo_path (str): The repository.
+        rev (str, optional): The revision to read. Defaults to "HEAD".
+
+    Returns:
+        List[str]: The directories, or an empty list when none are configured.
+    """
+    for filename, section in PYTEST_CONFIG_FILES:
+        content = _git(repo_path, ["show", f"{rev}:{filename}"])
+        if content is None:
+            continue
+        try:
+            if section is None:
+                if tomllib is None:
+                    continue
+                options = tomllib.loads(content).get("tool", {}).get("pytest", {}).get("ini_options")
+                if options is None:
+                    continue
+                testpaths = options.get("testpaths", [])
+                return [testpaths] if isinstance(testpaths, str) else list(testpaths)
+            parser = configparser.ConfigParser(interpolation=None)
+            parser.read_string(content)
+            if parser.has_section(section) or filename == "pytest.ini":
+                return parser.get(section, "testpaths", fallback="").split()
+        except (configparser.Error, ValueError) as e:
+            logging.warning(f"Could not read pytest configuration {filename} in {repo_path}: {e}")
+    return []
+
+
+DEFAULT_CLASSIFIER = TestFileClassifier()
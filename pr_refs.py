@@ -0,0 +1,173 @@
+import logging
+import re
+import subprocess
+from typing import Dict, Iterable, List, Optional
+
+from commit_graph import has_commit_graph, write_commit_graph
+
+# GitHub publishes every PR's tip as refs/pull/N/head, for open and closed PRs alike.
+PULL_REFSPECS = ["+refs/pull/*/head:refs/pull/*/head"]
+
+# GitHub's squash merge subject: the PR title followed by " (#N)".
+SQUASH_SUBJECT_PATTERN = re.compile(r"\(#(\d+)\)\s*$")
+
+
+def fetch_pull_refs(repo_path: str, remote: str = "origin") -> bool:
+    """
+    Fetches the `refs/pull/*/head` refs of all PRs into a local repository.
+
+    If the repository has a commit-graph, the fetched commits are added to it as a new layer.
+
+    Args:
+        repo_path (str): The path to the Git repository.
+        remote (str, optional): The remote to fetch from. Defaults to "origin".
+
+    Returns:
+        bool: True if the fetch succeeded.
+    """
+    logging.info(f"Fetching pull request refs into {repo_path}")
+    try:
+        subprocess.run(["git", "-C", repo_path, "fetch", "--quiet", remote] + PULL_REFSPECS,
+                       check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        logging.error(f"Failed to fetch pull request refs into {repo_path}: {e.stderr.strip()}")
+        return False
+    if has_commit_graph(repo_path):
+        write_commit_graph(repo_path, split=True)
+    return True
+
+
+def _git(repo_path: str, *args: str, stdin: Optional[str] = None) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", "-C", repo_path] + list(args), input=stdin, capture_output=True, text=True)
+
+
+def _patch_id(repo_path: str, old: str, new: str) -> Optional[str]:
+    diff = _git(repo_path, "diff", "--no-color", "--full-index", old, new)
+    if diff.returncode != 0 or not diff.stdout:
+        return None
+    output = _git(repo_path, "patch-id", "--stable", stdin=diff.stdout).stdout.split()
+    return output[0] if output else None
+
+
+class PullRequestIndex:
+    """
+    Commit SHA to PR number mapping built from the local `refs/pull/*/head` refs, for API-free PR identification.
+
+    A merge commit belongs to the PR whose head is one of its merged-in parents.
+    A squash merge is a new single-parent commit whose subject ends in GitHub's
+    `(#N)` suffix; it is taken for PR N only if it does what merging N's head
+    would: `git merge-tree --write-tree <parent> <head>` gives the commit's
+    tree, or, when the base moved on in a way that changes the merge result,
+    the commit's diff has the same `git patch-id` as the PR's changes. A commit
+    that is itself a PR head is never taken for a squash merge.
+
+    Args:
+        pulls (Dict[int, str]): Head commit by PR number.
+        repo_path (Optional[str], optional): The repository, needed to verify squash merges. Defaults to None.
+    """
+
+    def __init__(self, pulls: Optional[Dict[int, str]] = None, repo_path: Optional[str] = None):
+        self.pulls = pulls or {}
+        self.repo_path = repo_path
+        self.heads: Dict[str, int] = {}
+        for number, commit in sorted(self.pulls.items(), reverse=True):
+            # A commit can head several PRs (e.g. a reopened branch); keep the oldest PR.
+            self.heads[commit] = number
+
+    @classmethod
+    def from_repo(cls, repo_path: str) -> "PullRequestIndex":
+        """
+        Reads all `refs/pull/*/head` refs of a repository with a single `git for-each-ref`.
+
+        Args:
+            repo_path (str): The path to the Git repository.
+
+        Returns:
+            PullRequestIndex: The index; empty if the repository has no PR refs.
+        """
+        try:
+            output = subprocess.run(
+                ["git", "-C", repo_path, "for-each-ref", "--format=%(refname)%09%(objectname)", "refs/pull/"],
+                check=True, capture_output=True, text=True
+            ).stdout
+        except subprocess.CalledProcessError as e:
+            logging.error(f"Failed to list pull request refs in {repo_path}: {e.stderr.strip()}")
+            return cls(repo_path=repo_path)
+        pulls = {}
+        for line in output.splitlines():
+            refname, commit = line.split("\t")
+            parts = refname.split("/")
+            if len(parts) == 4 and parts[2].isdigit() and parts[3] == "head":
+                pulls[int(parts[2])] = commit
+        logging.info(f"Indexed {len(pulls)} PR heads in {repo_path}")
+        return cls(pulls, repo_path)
+
+    def __len__(self) -> int:
+        return len(self.pulls)
+
+    def squash_candidate(self, commit: str, message: Optional[str]) -> Optional[int]:
+        """
+        Returns the PR a single-parent commit may be the squash merge of, from its `(#N)` subject suffix.
+
+        Args:
+            commit (str): The commit hash.
+            message (Optional[str]): Its message (or just the subject).
+
+        Returns:
+            Optional[int]: The PR number, if that PR has a local head and the commit is not a PR head itself.
+        """
+        match = SQUASH_SUBJECT_PATTERN.search(message.split("\n", 1)[0]) if message else None
+        if match is None or commit in self.heads:
+            return None
+        number = int(match.group(1))
+        return number if number in self.pulls else None
+
+    def is_squash_of(self, commit: str, parent: str, tree: Optional[str], number: int) -> bool:
+        """
+        Checks that a commit on top of `parent` reproduces the changes of PR `number`.
+
+        Args:
+            commit (str): The commit hash.
+            parent (str): Its parent.
+            tree (Optional[str]): Its tree hash; without it only the patch IDs are compared.
+            number (int): The PR number.
+
+        Returns:
+            bool: True if the commit squash-merges the PR's head.
+        """
+        head = self.pulls[number]
+        if tree is not None:
+            # Exit code 1 means conflicts: the first line is still the (conflicted) tree.
+            merged = _git(self.repo_path, "merge-tree", "--write-tree", parent, head)
+            if merged.returncode in (0, 1) and merged.stdout.split("\n", 1)[0] == tree:
+                return True
+        base = _git(self.repo_path, "merge-base", parent, head).stdout.strip()
+        if not base:
+            return False
+        squash_id = _patch_id(self.repo_path, parent, commit)
+        return squash_id is not None and squash_id == _patch_id(self.repo_path, base, head)
+
+    def lookup(self, commit: str, parents: Iterable[str], tree: Optional[str] = None,
+               message: Optional[str] = None) -> Optional[int]:
+        """
+        Identifies the PR a mainline commit merged.
+
+        Args:
+            commit (str): The commit hash.
+            parents (Iterable[str]): Its parent hashes, first parent first.
+            tree (Optional[str], optional): Its tree hash, to verify squash merges. Defaults to None.
+            message (Optional[str], optional): Its message, needed to recognise squash merges. Defaults to None.
+
+        Returns:
+            Optional[int]: The PR number, or None if the commit does not merge a known PR.
+        """
+        parents: List[str] = list(parents)
+        for parent in parents[1:]:
+            if parent in self.heads:
+                return self.heads[parent]
+        if len(parents) != 1 or self.repo_path is None:
+            return None
+        number = self.squash_candidate(commit, message)
+        if number is not None and self.is_squash_of(commit, parents[0], tree, number):
+            return number
+        return None
@@ -1,49 +1,301 @@
+import csv
+import logging
 import math
-from typing import List, Optional
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
 
+import pandas as pd
 
-def process_repos_in_batches(repo_list: List[str], final_csv_filename: str, batch_size: int = 100, start_date: Optional[str] = None) -> None:
+from crawl_state import CrawlState
+from github_client import GitHubClient
+from mirror_store import MirrorStore
+from output_sink import PartitionedSink, append_csv, prepare_csv
+from pr_refs import PullRequestIndex, fetch_pull_refs
+from scraper_v03 import (
+    PROCESS_CONTEXT, clone_repo_if_needed, enrich_dataframe, explode_base_commits, get_head, get_scan_range,
+    handle_remove_readonly, initialize_csv, iter_repo_rows
+)
+
+
+def extract_repo(repo_name: str, repo_path: str, start_date: Optional[str] = None,
+                 last_sha: Optional[str] = None, pull_refs: bool = False) -> Tuple[List[list], Optional[Tuple[str, str]]]:
+    """
+    Runs the git extraction of one cloned repository. Executed in a worker process.
+
+    Args:
+        repo_name (str): The name of the repository.
+        repo_path (str): The path to the cloned repository.
+        start_date (Optional[str], optional): The start date for filtering merge commits. Defaults to None.
+        last_sha (Optional[str], optional): Only scan merges newer than this commit. Defaults to None.
+        pull_refs (bool, optional): Identify PRs from the local `refs/pull/*` refs. Defaults to False.
+
+    Returns:
+        Tuple[List[list], Optional[Tuple[str, str]]]: The CSV rows of the repository and the
+            (hash, date) of the head it was scanned up to.
+    """
+    head = get_head(repo_path)
+    if head is None:
+        return [], None
+    rev_range = get_scan_range(repo_path, last_sha, head[0])
+    pr_index = PullRequestIndex.from_repo(repo_path) if pull_refs else None
+    return list(iter_repo_rows(repo_name, repo_path, start_date, rev_range=rev_range, pr_index=pr_index)), head
+
+
+class StageTimer:
+    """Accumulates busy time and item counts per pipeline stage, across worker threads."""
+
+    def __init__(self):
+        self.stats: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, stage: str):
+        started = time.time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                stat = self.stats.setdefault(stage, [0, 0.0])
+                stat[0] += 1
+                stat[1] += time.time() - started
+
+    def report(self, wall_seconds: float) -> str:
+        parts = [f"{stage}: {int(count)} items, {busy:.1f}s busy" for stage, (count, busy) in self.stats.items()]
+        return "; ".join(parts) + f"; wall time {wall_seconds:.1f}s"
+
+
+def _write_batch(batch_index: int, rows: List[list]) -> str:
+    temp_csv = f"temp_batch_{batch_index+1}.csv"
+    if os.path.exists(temp_csv):
+        os.remove(temp_csv)
+    initialize_csv(temp_csv)
+    with open(temp_csv, 'a', newline='') as f:
+        csv.writer(f).writerows(rows)
+    return temp_csv
+
+
+def _enrich_batch(batch_index: int, temp_csv: str, client: Optional[GitHubClient]) -> str:
+    logging.info(f"Batch {batch_index+1} collected. Updating PR and issue data...")
+    df = pd.read_csv(temp_csv)
+    enrich_dataframe(df, client)
+    # The extracted rows stay untouched until the enriched ones are safely in their own file
+    enriched_csv = f"temp_batch_{batch_index+1}_enriched.csv"
+    explode_base_commits(df).to_csv(f"{enriched_csv}.tmp", index=False)
+    os.replace(f"{enriched_csv}.tmp", enriched_csv)
+    return enriched_csv
+
+
+def _reserve_position(enriched_csv: str, final_csv_filename: str, sink: Optional[PartitionedSink]) -> int:
+    if sink is not None:
+        return sink.next_number()
+    return prepare_csv(final_csv_filename, list(pd.read_csv(enriched_csv, nrows=0).columns))
+
+
+def _append_batch(batch_index: int, enriched_csv: str, position: int, final_csv_filename: str,
+                  sink: Optional[PartitionedSink] = None) -> None:
+    # Writing at the reserved position makes a retried append replace the rows of an interrupted one
+    temp_df = pd.read_csv(enriched_csv)
+    if sink is not None:
+        sink.append(temp_df, number=position)
+    else:
+        append_csv(temp_df, final_csv_filename, offset=position)
+    logging.info(f"Appended batch {batch_index+1}")
+
+
+def process_repos_in_batches(repo_list: List[str], final_csv_filename: str, batch_size: int = 100, start_date: Optional[str] = None,
+                             clone_workers: int = 4, extract_workers: Optional[int] = None, queue_size: int = 8,
+                             base_path: str = "repos", client: Optional[GitHubClient] = None, clone_strategy: str = "full",
+                             mirror_store: Optional[MirrorStore] = None, state: Optional[CrawlState] = None,
+                             sink: Optional[PartitionedSink] = None, pull_refs: bool = False) -> None:
     """
     Processes repositories in batches and appends the results to a final CSV file.
 
+    Work runs as three overlapping stages joined by bounded queues: cloning on a
+    thread pool, git extraction on a process pool, and enrichment of finished
+    batches (concurrent API requests) on the calling thread. A full queue blocks
+    the stage feeding it, so at most `queue_size` clones wait on disk at a time.
+
+    With a `state`, a rerun resumes where the previous one stopped: appended
+    batches are skipped, extracted batches whose rows still wait in their temp
+    CSV go straight to enrichment, enriched ones straight to the append, and
+    every repository is only scanned for merges newer than the head recorded
+    when its last batch was appended. Each batch's position in the output is
+    reserved before it is appended, so a batch interrupted while being appended
+    is written again in place rather than twice. A batch in which some
+    repository could not be cloned or extracted is appended but recorded as
+    "partial" instead of "done", so a resumed crawl runs it again: the other
+    repositories are then only scanned past their recorded heads, and the
+    failed ones from the start. Resumed batches are finished before any other,
+    so the positions they reserved are not overtaken by a re-run batch.
+
     Args:
         repo_list (List[str]): List of GitHub repositories.
         final_csv_filename (str): The final CSV file to store combined results.
         batch_size (int, optional): Number of repos to process per batch. Defaults to 100.
         start_date (Optional[str], optional): Optional start date for filtering merge commits.
+        clone_workers (int, optional): Number of concurrent clones. Defaults to 4.
+        extract_workers (Optional[int], optional): Number of extraction processes. Defaults to the CPU count.
+        queue_size (int, optional): Capacity of the queues between stages. Defaults to 8.
+        base_path (str, optional): The base path for cloned repositories. Defaults to "repos".
+        client (Optional[GitHubClient], optional): The API client used for enrichment. Defaults to GITHUB_CLIENT.
+        clone_strategy (str, optional): One of CLONE_STRATEGIES, see `clone_repo_if_needed`. Defaults to "full".
+        mirror_store (Optional[MirrorStore], optional): Lease reusable mirrors from this store instead of
+            cloning and deleting each repository. Defaults to None.
+        state (Optional[CrawlState], optional): Crawl progress to resume from and update. Defaults to None.
+        sink (Optional[PartitionedSink], optional): Write each batch as a new part of this dataset instead
+            of appending to `final_csv_filename`, which then only names the crawl. Defaults to None.
+        pull_refs (bool, optional): Identify PRs, squash merges included, from `refs/pull/*` refs fetched
+            into each clone (or kept by a mirror store created with `pull_refs=True`). Defaults to False.
     """
-    import pandas as pd
-    import os
-    import logging
-
-    from datetime import datetime
-
-    initialize_csv(final_csv_filename)
+    if sink is None:
+        initialize_csv(final_csv_filename)
 
     total_batches = math.ceil(len(repo_list) / batch_size)
+    extract_workers = extract_workers or os.cpu_count() or 1
+    timer = StageTimer()
+    started = time.time()
+
+    batch_repos = [repo_list[i * batch_size:(i + 1) * batch_size] for i in range(total_batches)]
+    records = [state.batch(f"{final_csv_filename}:{i}", repos) if state is not None else None
+               for i, repos in enumerate(batch_repos)]
+    pending = queue.Queue()
+    expected, resumed = [], []
+    for i, (repos, record) in enumerate(zip(batch_repos, records)):
+        resumed.append(record is not None and (record["status"] == "done" or os.path.exists(record["temp_csv"] or "")))
+        expected.append(0 if resumed[i] else len(repos))
+        if not resumed[i]:
+            for j, repo in enumerate(repos):
+                pending.put((i * batch_size + j, repo))
+    cloned = queue.Queue(maxsize=queue_size)
+    extracted = queue.Queue(maxsize=queue_size)
 
-    for i in range(total_batches):
-        batch = repo_list[i * batch_size:(i + 1) * batch_size]
-        temp_csv = f"temp_batch_{i+1}.csv"
+    def clone_stage() -> None:
+        while True:
+            try:
+                index, repo = pending.get_nowait()
+            except queue.Empty:
+                return
+            repo_path, lease = None, None
+            try:
+                with timer.track("clone"):
+                    if mirror_store is not None:
+                        lease = mirror_store.acquire(repo)
+                        repo_path = lease.path if lease is not None else None
+                    else:
+                        repo_path = clone_repo_if_needed(repo, base_path, clone_strategy, start_date)
+                        if repo_path and pull_refs:
+                            fetch_pull_refs(repo_path)
+            except Exception as e:
+                logging.error(f"Clone stage failed for {repo}: {e}")
+            cloned.put((index, repo, repo_path, lease))
 
-        logging.info(f"Starting batch {i+1}/{total_batches} with {len(batch)} repos")
+    def extract_stage(pool: ProcessPoolExecutor) -> None:
+        while True:
+            item = cloned.get()
+            if item is None:
+                return
+            index, repo, repo_path, lease = item
+            rows, head, ok = [], None, repo_path is not None
+            if repo_path:
+                last_sha = state.last_commit(repo) if state is not None else None
+                try:
+                    with timer.track("extract"):
+                        rows, head = pool.submit(extract_repo, repo, repo_path, start_date, last_sha, pull_refs).result()
+                except Exception as e:
+                    logging.error(f"Extraction stage failed for {repo}: {e}")
+                    ok = False
+                if lease is not None:
+                    lease.release()
+                elif os.path.exists(repo_path):
+                    shutil.rmtree(repo_path, onerror=handle_remove_readonly)
+                    logging.info(f"Deleted cloned repo at {repo_path} to save space")
+            extracted.put((index, repo, rows, head, ok))
 
-        # Process repos in current batch
-        for repo in batch:
-            process_repo(repo_name=repo, issues_data={}, csv_filename=temp_csv, start_date=start_date)
+    def finish_batch(i: int, results: Dict[int, Tuple[List[list], Optional[Tuple[str, str]], bool]]) -> None:
+        key, repos, record = f"{final_csv_filename}:{i}", batch_repos[i], records[i]
+        if resumed[i] and record["status"] == "done":
+            logging.info(f"Batch {i+1}/{total_batches} already appended, skipping")
+            return
+        status, position = "extracted", None
+        if resumed[i]:
+            logging.info(f"Resuming {record['status']} batch {i+1}/{total_batches} from {record['temp_csv']}")
+            status, temp_csv, heads, position = record["status"], record["temp_csv"], record["heads"], record.get("position")
+            failed = record.get("failed") or []
+        else:
+            batch_rows = [row for index in sorted(results) for row in results[index][0]]
+            heads = {repo_list[index]: list(head) for index, (_, head, _) in results.items() if head}
+            failed = [repo_list[index] for index in sorted(results) if not results[index][2]]
+            temp_csv = _write_batch(i, batch_rows) if batch_rows else None
+            if state is not None and temp_csv:
+                state.record_batch(key, repos, "extracted", temp_csv, heads, failed=failed)
+                state.save()
 
-        logging.info(f"Batch {i+1} collected. Updating PR and issue data...")
-        update_dataframe(temp_csv)
-        temp_df_expl = explode_base_commits(pd.read_csv(temp_csv))
-        temp_df_expl.to_csv(temp_csv, index = False)
+        logging.info(f"Starting enrichment of batch {i+1}/{total_batches} with {len(repos)} repos")
+        if temp_csv:
+            with timer.track("enrich"):
+                if status == "extracted":
+                    extracted_csv, temp_csv = temp_csv, _enrich_batch(i, temp_csv, client)
+                    position = _reserve_position(temp_csv, final_csv_filename, sink)
+                    if state is not None:
+                        state.record_batch(key, repos, "enriched", temp_csv, heads, position, failed=failed)
+                        state.save()
+                    os.remove(extracted_csv)
+                _append_batch(i, temp_csv, position, final_csv_filename, sink)
+        else:
+            logging.info(f"Batch {i+1} has no rows, skipping")
 
-        # Append temp.csv to final.csv
-        if os.path.exists(temp_csv):
-            temp_df = pd.read_csv(temp_csv)
-            final_df = pd.read_csv(final_csv_filename)
-            final_df = pd.concat([final_df, temp_df], ignore_index=True)
-            final_df.to_csv(final_csv_filename, index=False)
+        if failed:
+            logging.error(f"Batch {i+1}: {len(failed)} repos failed and are retried on resume: {failed}")
+        if state is not None:
+            for repo, head in heads.items():
+                state.record_repo(repo, *head)
+            # A partial batch is not skipped on resume; its appended repos are only scanned past their new heads
+            state.record_batch(key, repos, "partial" if failed else "done", heads=heads, failed=failed)
+            state.save()
+        if temp_csv and os.path.exists(temp_csv):
             os.remove(temp_csv)
-            logging.info(f"Appended and cleaned up batch {i+1}")
+            logging.info(f"Cleaned up batch {i+1}")
+
+    with ProcessPoolExecutor(max_workers=extract_workers, mp_context=PROCESS_CONTEXT) as pool:
+        threads = [threading.Thread(target=clone_stage, daemon=True) for _ in range(clone_workers)]
+        threads += [threading.Thread(target=extract_stage, args=(pool,), daemon=True) for _ in range(extract_workers)]
+        for thread in threads:
+            thread.start()
+
+        # Resumed batches go first: a position reserved before the interruption must be
+        # written before a re-run partial batch appends anything after it
+        for i in range(total_batches):
+            if resumed[i]:
+                finish_batch(i, {})
+
+        batches: Dict[int, Dict[int, Tuple[List[list], Optional[Tuple[str, str]], bool]]] = {}
+        next_batch = 0
+        for received in range(sum(expected) + 1):
+            if received:
+                index, repo, rows, head, ok = extracted.get()
+                logging.info(f"Extracted {len(rows)} rows from {repo}")
+                batches.setdefault(index // batch_size, {})[index] = (rows, head, ok)
+
+            while next_batch < total_batches and len(batches.get(next_batch, {})) == expected[next_batch]:
+                results = batches.pop(next_batch, {})
+                if not resumed[next_batch]:
+                    finish_batch(next_batch, results)
+                next_batch += 1
+
+        for _ in range(extract_workers):
+            cloned.put(None)
+        for thread in threads:
+            thread.join()
+
+    if state is not None:
+        state.clear_batches(f"{final_csv_filename}:")
+        state.save()
 
-    logging.info(f"All batches processed. Final CSV at {final_csv_filename}")
\ No newline at end of file
+    logging.info(f"Stage timings: {timer.report(time.time() - started)}")
+    logging.info(f"All batches processed. Final CSV at {final_csv_filename}")
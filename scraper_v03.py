@@ -1,36 +1,78 @@
 import subprocess
 import os
 import logging
-import re
-import requests
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import csv
-from typing import List, Tuple, Optional
-import time
+from typing import Dict, Iterator, List, Tuple, Optional
 import ast
+import math
+import multiprocessing
 import shutil
 import stat
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from datetime import datetime, timedelta
+
+from arrow_schema import ROW_SCHEMA, read_dataframe, to_table, write_parquet
+from commit_graph import has_commit_graph, write_commit_graph
+from explode import explode_groups
+from git_pool import GitWorkerPool
+from github_client import GitHubClient
+from github_graphql import GraphQLBatcher
+from github_listing import ListingPrefetcher
+from crawl_state import CrawlState
+from http_cache import ResponseCache
+from issue_cache import IssueCache
+from issue_refs import closing_issues_batch, pr_numbers_batch
+from mirror_store import CLONE_URL_TEMPLATE, MirrorStore
+from output_sink import PartitionedSink
+from pr_refs import PullRequestIndex, fetch_pull_refs
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+# Comma-separated tokens pooled by the client; each request uses the one with the most quota left.
+GITHUB_TOKENS = [token.strip() for token in os.getenv("GITHUB_TOKENS", "").split(",") if token.strip()] or [GITHUB_TOKEN]
+# Responses are revalidated with ETags on reruns; the file is created on the first request.
+# Set GITHUB_CACHE_PATH="" to disable the cache.
+GITHUB_CACHE_PATH = os.getenv("GITHUB_CACHE_PATH", "github_cache.sqlite")
+GITHUB_CLIENT = GitHubClient(
+    GITHUB_TOKENS,
+    max_in_flight=int(os.getenv("GITHUB_MAX_IN_FLIGHT", "8")),
+    cache=ResponseCache(GITHUB_CACHE_PATH) if GITHUB_CACHE_PATH else None
+)
+
+# Issue details shared by all rows and batches; GITHUB_ISSUE_CACHE_PATH also keeps closed issues on disk.
+ISSUE_CACHE = IssueCache(path=os.getenv("GITHUB_ISSUE_CACHE_PATH") or None)
+
+# Long-lived git processes shared by the per-commit helpers; set to None to spawn one `git` per query.
+GIT_POOL: Optional[GitWorkerPool] = GitWorkerPool()
+
+# Start method of the worker process pools. Forking the crawler while its threads run `git` would
+# hand their subprocess pipes to the workers, and those threads would wait for EOF forever.
+PROCESS_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
 
 class GitHubRateLimitExceeded(Exception):
     pass
 
 
-def run_git_command(repo_path: str, command: List[str]) -> Optional[str]:
+def run_git_command(repo_path: str, command: List[str], stdin: Optional[str] = None) -> Optional[str]:
     """
     Executes a Git command and returns the standard output.
 
     Args:
         repo_path (str): The path to the Git repository.
         command (List[str]): The Git command to run.
+        stdin (Optional[str], optional): Text fed to the command's standard input. Defaults to None.
 
     Returns:
         Optional[str]: The standard output of the Git command, or None if an error occurs.
     """
     try:
         result = subprocess.run(
-            ['git', '-C', repo_path] + command, capture_output=True, text=True, check=True
+            ['git', '-C', repo_path] + command, input=stdin, capture_output=True, text=True, check=True
         )
         return result.stdout.strip()
     except subprocess.CalledProcessError as e:
@@ -38,13 +80,53 @@ def run_git_command(repo_path: str, command: List[str]) -> Optional[str]:
         return None
 
 
-def clone_repo_if_needed(repo_name: str, base_path: str = "repos") -> Optional[str]:
+def read_commit(repo_path: str, commit_hash: str) -> Optional[dict]:
+    """
+    Reads a commit through the shared git worker pool.
+
+    Args:
+        repo_path (str): The path to the Git repository.
+        commit_hash (str): The commit hash.
+
+    Returns:
+        Optional[dict]: The commit's 'parents', 'date' and 'message', or None if the pool is
+            disabled or the lookup failed.
+    """
+    return GIT_POOL.read_commit(repo_path, commit_hash) if GIT_POOL is not None else None
+
+
+# Extra `git clone` arguments per strategy; "{since}" is filled from start_date minus the margin.
+CLONE_STRATEGIES = {
+    "full": [],
+    "blobless": ["--filter=blob:none", "--no-checkout"],
+    "shallow": ["--filter=blob:none", "--no-checkout", "--shallow-since={since}"],
+    "bare": ["--bare", "--filter=blob:none"],
+}
+
+
+def clone_repo_if_needed(repo_name: str, base_path: str = "repos", strategy: str = "full",
+                         start_date: Optional[str] = None, margin_days: int = 30, commit_graph: bool = False) -> Optional[str]:
     """
     Clones a Git repository if it doesn't already exist at the specified path.
 
+    The "blobless", "shallow" and "bare" strategies skip file contents (and, for
+    "shallow", history older than `start_date` minus `margin_days`), which is all
+    the merge scan needs: commit messages, parents, dates and trees for name-only diffs.
+
+    With `commit_graph`, non-shallow clones get a commit-graph with changed-path
+    Bloom filters (see `commit_graph.write_commit_graph`), written after cloning or
+    when an existing clone lacks one. It is off by default: `process_repo` scans a
+    fresh clone once and deletes it, and a single `git log` pass costs less than
+    writing the graph. Clones kept for repeated scans (and `MirrorStore` mirrors,
+    which maintain one by default) are where it pays off.
+
     Args:
         repo_name (str): The name of the Git repository to clone.
         base_path (str, optional): The base path where the repository will be cloned. Defaults to "repos".
+        strategy (str, optional): One of CLONE_STRATEGIES. Defaults to "full".
+        start_date (Optional[str], optional): The scan start date, used by the "shallow" strategy. Defaults to None.
+        margin_days (int, optional): Extra history fetched before `start_date`. Defaults to 30.
+        commit_graph (bool, optional): Write a commit-graph for the clone. Defaults to False.
 
     Returns:
         Optional[str]: The path to the cloned repository, or None if cloning fails.
@@ -52,23 +134,96 @@ def clone_repo_if_needed(repo_name: str, base_path: str = "repos") -> Optional[s
     repo_path = os.path.join(base_path, repo_name)
     if not os.path.exists(repo_path):
         os.makedirs(base_path, exist_ok=True)
-        repo_url = f"https://github.com/{repo_name}.git"
-        logging.info(f"Cloning repository: {repo_url}")
+        repo_url = CLONE_URL_TEMPLATE.format(repo_name=repo_name)
+        if strategy == "shallow" and not start_date:
+            strategy = "blobless"
+        options = [option.format(since=shallow_since(start_date, margin_days)) for option in CLONE_STRATEGIES[strategy]]
+        logging.info(f"Cloning repository: {repo_url} ({strategy})")
         try:
-            subprocess.run(["git", "clone", repo_url, repo_path], check=True)
+            subprocess.run(["git", "clone"] + options + [repo_url, repo_path], check=True)
         except subprocess.CalledProcessError:
             logging.error(f"Failed to clone {repo_name}")
             return None
+        if strategy == "shallow":
+            deepen_if_needed(repo_path, start_date)
+    if commit_graph and not has_commit_graph(repo_path):
+        write_commit_graph(repo_path)
     return repo_path
 
 
-def get_merge_commits(repo_path: str, start_date: Optional[str] = None) -> List[Tuple[str, str]]:
+def shallow_since(start_date: Optional[str], margin_days: int = 30) -> Optional[str]:
+    """
+    Returns the `--shallow-since` cut-off: `start_date` minus `margin_days`.
+
+    Args:
+        start_date (Optional[str]): The scan start date, ideally "YYYY-MM-DD".
+        margin_days (int, optional): Days of history kept before `start_date`. Defaults to 30.
+
+    Returns:
+        Optional[str]: The cut-off date, or `start_date` unchanged if it is not an ISO date.
+    """
+    try:
+        return (datetime.fromisoformat(start_date[:10]) - timedelta(days=margin_days)).strftime('%Y-%m-%d')
+    except (TypeError, ValueError):
+        return start_date
+
+
+def get_shallow_boundary(repo_path: str) -> List[str]:
+    """
+    Lists the commits whose parents were cut off by a shallow clone.
+
+    Args:
+        repo_path (str): The path to the Git repository.
+
+    Returns:
+        List[str]: The boundary commit hashes (empty for a complete clone).
+    """
+    shallow_file = run_git_command(repo_path, ['rev-parse', '--git-path', 'shallow'])
+    if not shallow_file:
+        return []
+    shallow_file = os.path.join(repo_path, shallow_file)
+    if not os.path.exists(shallow_file):
+        return []
+    with open(shallow_file) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def deepen_if_needed(repo_path: str, start_date: Optional[str], step: int = 100, max_rounds: int = 50) -> None:
+    """
+    Deepens a shallow clone until no boundary commit lies inside the scan window.
+
+    A boundary commit dated on or after `start_date` may be a merge whose parents
+    were cut off, which would hide it from `git log --merges`, so history is
+    fetched `step` commits deeper until every boundary predates the window.
+
+    Args:
+        repo_path (str): The path to the Git repository.
+        start_date (Optional[str]): The scan start date.
+        step (int, optional): Commits fetched per deepening round. Defaults to 100.
+        max_rounds (int, optional): Rounds before giving up and unshallowing. Defaults to 50.
+    """
+    cutoff = shallow_since(start_date, 0)
+    for _ in range(max_rounds):
+        boundary = get_shallow_boundary(repo_path)
+        dates = get_commit_dates_bulk(repo_path, boundary)
+        inside = [commit for commit in boundary if dates.get(commit, "")[:10] >= (cutoff or "")]
+        if not inside:
+            return
+        logging.info(f"Deepening {repo_path}: {len(inside)} shallow boundary commits inside the scan window")
+        if run_git_command(repo_path, ['fetch', '--quiet', f'--deepen={step}', 'origin']) is None:
+            break
+    logging.warning(f"Could not bound shallow history of {repo_path}, fetching full history")
+    run_git_command(repo_path, ['fetch', '--quiet', '--unshallow', 'origin'])
+
+
+def get_merge_commits(repo_path: str, start_date: Optional[str] = None, rev_range: Optional[str] = None) -> List[Tuple[str, str]]:
     """
     Retrieves a list of merge commits from the Git repository.
 
     Args:
         repo_path (str): The path to the Git repository.
         start_date (Optional[str], optional): The start date to filter merge commits. Defaults to None.
+        rev_range (Optional[str], optional): Revisions to scan, e.g. "<last_sha>..<head>". Defaults to HEAD.
 
     Returns:
         List[Tuple[str, str]]: A list of tuples containing the commit hash and the commit date.
@@ -76,6 +231,8 @@ def get_merge_commits(repo_path: str, start_date: Optional[str] = None) -> List[
     command = ['log', '--merges', '--pretty=%H %ci']
     if start_date:
         command.insert(1, f'--since={start_date}')
+    if rev_range:
+        command.append(rev_range)
     
     output = run_git_command(repo_path, command)
     return [(line.split()[0], ' '.join(line.split()[1:])) for line in output.split('\n') if line] if output else []
@@ -92,6 +249,9 @@ def get_parent_commits(repo_path: str, merge_commit: str) -> List[str]:
     Returns:
         List[str]: A list of parent commit hashes.
     """
+    commit = read_commit(repo_path, merge_commit)
+    if commit is not None:
+        return commit['parents'] if len(commit['parents']) > 1 else []
     output = run_git_command(repo_path, ['rev-list', '--parents', '-n', '1', merge_commit])
     if output:
         parts = output.split()
@@ -110,6 +270,9 @@ def get_commit_date(repo_path: str, commit_hash: str) -> str:
     Returns:
         str: The commit date, or "Unknown" if not found.
     """
+    commit = read_commit(repo_path, commit_hash)
+    if commit is not None:
+        return commit['date']
     return run_git_command(repo_path, ['show', '-s', '--format=%ci', commit_hash]) or "Unknown"
 
 
@@ -124,9 +287,23 @@ def get_issues_from_pr(repo_path: str, merge_commit: str) -> Optional[str]:
     Returns:
         Optional[str]: The issue number, or None if no issue is found.
     """
-    output = run_git_command(repo_path, ['log', '-1', '--pretty=%B', merge_commit])
-    match = re.search(r'(?:fixes|closes|resolves)?\s*#(\d+)', output, re.IGNORECASE) if output else None
-    return match.group(1) if match else None
+    commit = read_commit(repo_path, merge_commit)
+    output = commit['message'].strip() if commit is not None else run_git_command(repo_path, ['log', '-1', '--pretty=%B', merge_commit])
+    return parse_issue_number(output)
+
+
+def parse_issue_number(message: Optional[str]) -> Optional[str]:
+    """
+    Extracts the PR number from a merge commit message, see `issue_refs.pr_numbers_batch`.
+
+    Args:
+        message (Optional[str]): The commit message.
+
+    Returns:
+        Optional[str]: The PR number, or None if no reference is found.
+    """
+    number = pr_numbers_batch([message])[0]
+    return str(number) if number is not None else None
 
 
 def get_changed_files(repo_path: str, parent_commit: str, merge_commit: str) -> List[str]:
@@ -141,6 +318,10 @@ def get_changed_files(repo_path: str, parent_commit: str, merge_commit: str) ->
     Returns:
         List[str]: A list of changed file paths.
     """
+    if GIT_POOL is not None:
+        changed_files = GIT_POOL.changed_files(repo_path, parent_commit, merge_commit)
+        if changed_files is not None:
+            return changed_files
     output = run_git_command(repo_path, ['diff', '--name-only', f"{parent_commit}..{merge_commit}"])
     return output.split("\n") if output else []
 
@@ -156,111 +337,394 @@ def get_pr_description(repo_path: str, merge_commit: str) -> str:
     Returns:
         str: The PR description, or "No description" if not found.
     """
+    commit = read_commit(repo_path, merge_commit)
+    if commit is not None:
+        return commit['message'].strip() or "No description"
     output = run_git_command(repo_path, ['log', '-1', '--pretty=%B', merge_commit])
     return output.strip() if output else "No description"
 
 
-def get_pr_dates(repo_name: str, pr_number: int) -> Tuple[str, str]:
+MERGE_LOG_FORMAT = '%H%x1f%P%x1f%T%x1f%ci%x1f%B%x1e'
+
+
+def list_scan_commits(repo_path: str, start_date: Optional[str] = None, rev_range: Optional[str] = None,
+                      pr_index: Optional[PullRequestIndex] = None) -> List[str]:
+    """
+    Lists the commits to scan, in `git log` order, without their messages.
+
+    Without a `pr_index` these are the merge commits `iter_merge_records` streams.
+    With one, single-parent commits whose subject names a known PR (see
+    `PullRequestIndex.squash_candidate`) are kept as well, so possible squash
+    merges are scanned without streaming every other commit of the history.
+
+    Args:
+        repo_path (str): The path to the Git repository.
+        start_date (Optional[str], optional): The start date to filter merge commits. Defaults to None.
+        rev_range (Optional[str], optional): Revisions to scan, e.g. "<last_sha>..<head>". Defaults to HEAD.
+        pr_index (Optional[PullRequestIndex], optional): SHA to PR mapping, see `iter_repo_rows`. Defaults to None.
+
+    Returns:
+        List[str]: The commit hashes.
+    """
+    if pr_index is None:
+        command = ['log', '--merges', '--pretty=format:%H']
+    else:
+        command = ['log', '--pretty=format:%H%x1f%P%x1f%s']
+    if start_date:
+        command.insert(1, f'--since={start_date}')
+    if rev_range:
+        command.append(rev_range)
+    output = run_git_command(repo_path, command)
+    if not output:
+        return []
+    if pr_index is None:
+        return output.split()
+    commits = []
+    for line in output.splitlines():
+        commit, parents, subject = line.split('\x1f', 2)
+        if len(parents.split()) > 1 or pr_index.squash_candidate(commit, subject) is not None:
+            commits.append(commit)
+    return commits
+
+
+def iter_merge_records(repo_path: str, start_date: Optional[str] = None, rev_range: Optional[str] = None,
+                       commits: Optional[List[str]] = None) -> Iterator[Dict[str, object]]:
+    """
+    Streams merge commits from a single `git log --merges` invocation.
+
+    Records and fields are delimited with ASCII record/unit separators, so full
+    commit messages survive intact and no per-commit git calls are needed.
+
+    Args:
+        repo_path (str): The path to the Git repository.
+        start_date (Optional[str], optional): The start date to filter merge commits. Defaults to None.
+        rev_range (Optional[str], optional): Revisions to scan, e.g. "<last_sha>..<head>". Defaults to HEAD.
+        commits (Optional[List[str]], optional): Stream exactly these commits, in this order, instead of
+            walking history (the other filters are then ignored), e.g. one shard of `list_scan_commits`.
+            Defaults to None.
+
+    Yields:
+        Dict[str, object]: Records with 'hash', 'parents', 'tree', 'date' and 'message' keys.
+    """
+    if commits is not None:
+        if not commits:
+            return
+        command = ['git', '-C', repo_path, 'log', '--no-walk=unsorted', '--stdin', f'--pretty=format:{MERGE_LOG_FORMAT}']
+    else:
+        command = ['git', '-C', repo_path, 'log', '--merges', f'--pretty=format:{MERGE_LOG_FORMAT}']
+        if start_date:
+            command.insert(4, f'--since={start_date}')
+        if rev_range:
+            command.append(rev_range)
+
+    process = subprocess.Popen(command, stdin=subprocess.PIPE if commits is not None else subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if commits is not None:
+        # git reads all of stdin before it starts writing, so this cannot deadlock
+        process.stdin.write('\n'.join(commits) + '\n')
+        process.stdin.close()
+    buffer = ''
+    for chunk in iter(lambda: process.stdout.read(65536), ''):
+        buffer += chunk
+        *records, buffer = buffer.split('\x1e')
+        for record in records:
+            fields = record.lstrip('\n').split('\x1f', 4)
+            if len(fields) == 5:
+                commit, parents, tree, date, message = fields
+                yield {'hash': commit, 'parents': parents.split(), 'tree': tree, 'date': date, 'message': message.strip()}
+
+    stderr = process.stderr.read()
+    if process.wait() != 0:
+        logging.error(f"Git command failed: {' '.join(command[3:])}: {stderr.strip()}")
+
+
+def get_commit_dates_bulk(repo_path: str, commits: List[str]) -> Dict[str, str]:
+    """
+    Retrieves the dates of many commits with a single `git log --no-walk --stdin` call.
+
+    Args:
+        repo_path (str): The path to the Git repository.
+        commits (List[str]): The commit hashes.
+
+    Returns:
+        Dict[str, str]: A mapping from commit hash to commit date.
+    """
+    if not commits:
+        return {}
+    output = run_git_command(
+        repo_path, ['log', '--no-walk=unsorted', '--stdin', '--pretty=%H %ci'], stdin='\n'.join(commits) + '\n'
+    )
+    return {line.split()[0]: ' '.join(line.split()[1:]) for line in output.split('\n') if line} if output else {}
+
+
+def get_changed_files_bulk(repo_path: str, pairs: List[Tuple[str, str]]) -> List[List[str]]:
+    """
+    Retrieves the changed files for many (parent, merge) pairs with a single `git diff-tree --stdin` call.
+
+    Args:
+        repo_path (str): The path to the Git repository.
+        pairs (List[Tuple[str, str]]): (parent commit, merge commit) pairs.
+
+    Returns:
+        List[List[str]]: The changed file paths for each pair, in input order.
+    """
+    if not pairs:
+        return []
+    output = run_git_command(
+        repo_path,
+        ['diff-tree', '--stdin', '-r', '-M', '--name-only', '--always', '--format=%x00'],
+        stdin=''.join(f"{merge_commit} {parent_commit}\n" for parent_commit, merge_commit in pairs)
+    )
+    sections = output.split('\x00')[1:] if output is not None else []
+    if len(sections) != len(pairs):
+        logging.warning(f"Bulk diff returned {len(sections)} sections for {len(pairs)} pairs, falling back to per-pair diffs")
+        return [get_changed_files(repo_path, parent_commit, merge_commit) for parent_commit, merge_commit in pairs]
+    return [[line for line in section.split('\n') if line] for section in sections]
+
+
+def get_head(repo_path: str) -> Optional[Tuple[str, str]]:
+    """
+    Retrieves the commit HEAD points to.
+
+    Args:
+        repo_path (str): The path to the Git repository.
+
+    Returns:
+        Optional[Tuple[str, str]]: The commit hash and date, or None for an empty repository.
+    """
+    output = run_git_command(repo_path, ['log', '-1', '--pretty=%H %ci', 'HEAD'])
+    return (output.split()[0], ' '.join(output.split()[1:])) if output else None
+
+
+def get_scan_range(repo_path: str, last_sha: Optional[str], head_sha: str) -> str:
+    """
+    Builds the revision range for an incremental scan.
+
+    Args:
+        repo_path (str): The path to the Git repository.
+        last_sha (Optional[str]): The newest commit scanned by a previous run.
+        head_sha (str): The commit to scan up to.
+
+    Returns:
+        str: "<last_sha>..<head_sha>", or just `head_sha` when there is no usable previous commit.
+    """
+    if last_sha:
+        if run_git_command(repo_path, ['cat-file', '-e', f'{last_sha}^{{commit}}']) is not None:
+            return f"{last_sha}..{head_sha}"
+        logging.warning(f"Last scanned commit {last_sha} is not in {repo_path}, rescanning from start_date")
+    return head_sha
+
+
+def build_row(repo_name: str, parent_commits: List[str], base_commit_dates: List[str],
+              merge_commit: str, resolving_commit_date: str, issue_number: str,
+              changed_files: List[List[str]], pr_description: str) -> list:
+    """
+    Builds a CSV row in the column order written by `initialize_csv`.
+
+    Returns:
+        list: The row, with enrichment columns left as None placeholders.
+    """
+    num_changed_files = list(map(len, changed_files))
+    return [
+        repo_name, parent_commits, base_commit_dates,
+        merge_commit, resolving_commit_date,
+        issue_number, None, None,
+        #PR_closed_date, PR_open_date,
+        num_changed_files, changed_files,
+        None, None, pr_description, None, None
+    ]
+
+
+def iter_repo_rows(repo_name: str, repo_path: str, start_date: Optional[str] = None, batch_size: int = 500,
+                   rev_range: Optional[str] = None, pr_index: Optional[PullRequestIndex] = None,
+                   commits: Optional[List[str]] = None) -> Iterator[list]:
+    """
+    Yields CSV rows for a repository using one streamed `git log` plus two bulk calls per batch of merges.
+
+    With a `pr_index` the PR of each commit is looked up locally instead of parsed
+    from its message (which stays the fallback for merges the index does not know),
+    and single-parent commits whose subject ends in a known PR's `(#N)` are scanned
+    too, so verified squash merges become rows. The commits are then listed first
+    with `list_scan_commits` and streamed with `--no-walk`.
+
+    Args:
+        repo_name (str): The name of the repository.
+        repo_path (str): The path to the Git repository.
+        start_date (Optional[str], optional): The start date for filtering merge commits. Defaults to None.
+        batch_size (int, optional): Number of merge commits resolved per bulk call. Defaults to 500.
+        rev_range (Optional[str], optional): Revisions to scan, see `get_scan_range`. Defaults to HEAD.
+        pr_index (Optional[PullRequestIndex], optional): SHA to PR mapping from `refs/pull/*`. Defaults to None.
+        commits (Optional[List[str]], optional): Only process these commits, see `iter_merge_records`.
+            Defaults to None.
+
+    Yields:
+        list: Rows in the same format as the per-commit path of `process_repo`.
+    """
+    if pr_index is not None and commits is None:
+        commits = list_scan_commits(repo_path, start_date, rev_range, pr_index)
+    batch = []
+    for record in iter_merge_records(repo_path, start_date, rev_range, commits=commits):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield from _rows_from_merge_batch(repo_name, repo_path, batch, pr_index)
+            batch = []
+    if batch:
+        yield from _rows_from_merge_batch(repo_name, repo_path, batch, pr_index)
+
+
+def _rows_from_merge_batch(repo_name: str, repo_path: str, batch: List[Dict[str, object]],
+                           pr_index: Optional[PullRequestIndex] = None) -> Iterator[list]:
+    records = []
+    for record, number in zip(batch, pr_numbers_batch([record['message'] for record in batch])):
+        if pr_index is not None:
+            if not record['parents']:
+                continue
+            indexed = pr_index.lookup(record['hash'], record['parents'], record['tree'], record['message'])
+            if indexed is None and len(record['parents']) < 2:
+                continue
+            number = indexed if indexed is not None else number
+        issue_number = str(number) if number is not None else None
+        if issue_number is None:
+            logging.warning(f"No issue number found for {repo_name} merge commit {record['hash']}")
+            continue
+        records.append((record, issue_number))
+
+    logging.info(f"Processing {repo_name}: {len(records)} merge commits in bulk")
+    parents = list(dict.fromkeys(parent for record, _ in records for parent in record['parents']))
+    dates = get_commit_dates_bulk(repo_path, parents)
+    pairs = [(parent, record['hash']) for record, _ in records for parent in record['parents']]
+    changed = iter(get_changed_files_bulk(repo_path, pairs))
+
+    for record, issue_number in records:
+        parent_commits = record['parents']
+        yield build_row(
+            repo_name, parent_commits, [dates.get(commit, "Unknown") for commit in parent_commits],
+            record['hash'], record['date'], issue_number,
+            [next(changed) for _ in parent_commits], record['message'] or "No description"
+        )
+
+
+def extract_shard(repo_name: str, repo_path: str, commits: List[str],
+                  pr_index: Optional[PullRequestIndex] = None) -> List[list]:
+    """
+    Extracts the rows of one shard of a repository scan. Executed in a worker process.
+
+    Args:
+        repo_name (str): The name of the repository.
+        repo_path (str): The path to the Git repository.
+        commits (List[str]): The shard's commits, in scan order.
+        pr_index (Optional[PullRequestIndex], optional): SHA to PR mapping, see `iter_repo_rows`. Defaults to None.
+
+    Returns:
+        List[list]: The rows of the shard.
+    """
+    return list(iter_repo_rows(repo_name, repo_path, pr_index=pr_index, commits=commits))
+
+
+def iter_sharded_rows(repo_name: str, repo_path: str, shards: int, start_date: Optional[str] = None,
+                      rev_range: Optional[str] = None, pr_index: Optional[PullRequestIndex] = None) -> Iterator[list]:
+    """
+    Yields the same rows as `iter_repo_rows`, extracting contiguous shards of the scan in parallel processes.
+
+    The commits to scan are listed once with the same `git log` filters as the
+    sequential scan and cut into `shards` consecutive runs. Each worker streams
+    its run with `git log --no-walk --stdin` and does the bulk date and diff calls
+    against the same local repository, and the shards are yielded back in order,
+    so every commit lands in exactly one shard and the output does not depend on
+    the shard count. Shards are by commit count rather than by date, which keeps
+    them balanced and avoids `--since`/`--until` boundaries on non-monotonic
+    commit dates.
+
+    Args:
+        repo_name (str): The name of the repository.
+        repo_path (str): The path to the Git repository.
+        shards (int): Number of shards and worker processes.
+        start_date (Optional[str], optional): The start date for filtering merge commits. Defaults to None.
+        rev_range (Optional[str], optional): Revisions to scan, see `get_scan_range`. Defaults to HEAD.
+        pr_index (Optional[PullRequestIndex], optional): SHA to PR mapping, see `iter_repo_rows`. Defaults to None.
+
+    Yields:
+        list: Rows in scan order.
+    """
+    commits = list_scan_commits(repo_path, start_date, rev_range, pr_index)
+    if not commits:
+        return
+    size = math.ceil(len(commits) / shards)
+    chunks = [commits[i:i + size] for i in range(0, len(commits), size)]
+    logging.info(f"Scanning {repo_name}: {len(commits)} commits in {len(chunks)} shards")
+    with ProcessPoolExecutor(max_workers=len(chunks), mp_context=PROCESS_CONTEXT) as executor:
+        for rows in executor.map(extract_shard, repeat(repo_name), repeat(repo_path), chunks, repeat(pr_index)):
+            yield from rows
+
+
+def get_pr_dates(repo_name: str, pr_number: int, client: Optional[GitHubClient] = None) -> Tuple[str, str]:
     """
     Fetches the open and close dates of a pull request from the GitHub API.
 
     Args:
         repo_name (str): The GitHub repository name.
         pr_number (int): The pull request number.
+        client (Optional[GitHubClient], optional): The API client. Defaults to GITHUB_CLIENT.
 
     Returns:
         Tuple[str, str]: A tuple containing the PR open date and close date.
     """
-    url = f"https://api.github.com/repos/{repo_name}/pulls/{pr_number}"
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "Authorization": f"token {GITHUB_TOKEN}"
-    }
-
-    while True:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 403 and response.headers.get("X-RateLimit-Remaining") == "0":
-            reset_time = int(response.headers.get("X-RateLimit-Reset", 0))
-            sleep_seconds = max(reset_time - int(time.time()), 0) + 1
-            logging.warning(f"Rate limit exceeded. Sleeping for {sleep_seconds} seconds...")
-            time.sleep(sleep_seconds)
-            continue
-        break
-
-    if response.status_code == 200:
-        data = response.json()
+    status, data = (client or GITHUB_CLIENT).get_pull(repo_name, pr_number)
+    if data is not None:
         return data.get("created_at", ""), data.get("closed_at", "")
     else:
-        logging.warning(f"Failed to fetch PR {pr_number} from {repo_name} with status {response.status_code}")
+        logging.warning(f"Failed to fetch PR {pr_number} from {repo_name} with status {status}")
         return "", ""
 
 
-def get_linked_issues(repo_name: str, pr_number: int) -> List[str]:
+def parse_linked_issues(pr_body: Optional[str], repo_name: Optional[str] = None) -> List[str]:
+    """
+    Extracts closing issue references ("fixes #123") from a pull request body.
+
+    Args:
+        pr_body (Optional[str]): The pull request body.
+        repo_name (Optional[str], optional): The repository, to keep `owner/repo#N` references to itself.
+            Defaults to None.
+
+    Returns:
+        List[str]: A list of unique linked issue numbers, see `issue_refs.closing_issues_batch`.
+    """
+    return [str(number) for number in closing_issues_batch([pr_body], [repo_name])[0]]
+
+
+def get_linked_issues(repo_name: str, pr_number: int, client: Optional[GitHubClient] = None) -> List[str]:
     """
     Retrieves the linked issue numbers from a pull request description using the GitHub API.
 
     Args:
         repo_name (str): The GitHub repository name.
         pr_number (int): The pull request number.
+        client (Optional[GitHubClient], optional): The API client. Defaults to GITHUB_CLIENT.
 
     Returns:
         List[str]: A list of linked issue numbers.
     """
-    url = f"https://api.github.com/repos/{repo_name}/pulls/{pr_number}"
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "Authorization": f"token {GITHUB_TOKEN}"
-    }
-
-    while True:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 403 and response.headers.get("X-RateLimit-Remaining") == "0":
-            reset_time = int(response.headers.get("X-RateLimit-Reset", 0))
-            sleep_seconds = max(reset_time - int(time.time()), 0) + 1
-            logging.warning(f"Rate limit exceeded. Sleeping for {sleep_seconds} seconds...")
-            time.sleep(sleep_seconds)
-            continue
-        break
-
-    if response.status_code == 200:
-        data = response.json()
-        pr_body = data.get("body", "")
-        issue_numbers = re.findall(r"(?:fixes|closes|resolves)\s+#(\d+)", str(pr_body), re.IGNORECASE)
-        issue_numbers = [num for num in issue_numbers if num != "1234"]
-        return list(set(issue_numbers))
+    status, data = (client or GITHUB_CLIENT).get_pull(repo_name, pr_number)
+    if data is not None:
+        return parse_linked_issues(data.get("body", ""), repo_name)
     else:
         logging.warning(f"Failed to fetch PR {pr_number} from {repo_name}")
         return []
 
-def get_issue_details(repo_name: str, issue_number: int) -> Tuple[str, str, str]:
+def get_issue_details(repo_name: str, issue_number: int, client: Optional[GitHubClient] = None) -> Tuple[str, str, str]:
     """
     Fetches details for a GitHub issue including open/close dates and description.
 
     Args:
         repo_name (str): The GitHub repository name.
         issue_number (int): The issue number.
+        client (Optional[GitHubClient], optional): The API client. Defaults to GITHUB_CLIENT.
 
     Returns:
         Tuple[str, str, str]: A tuple containing the open date, close date, and issue description.
     """
-    url = f"https://api.github.com/repos/{repo_name}/issues/{issue_number}"
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "Authorization": f"token {GITHUB_TOKEN}"
-    }
-
-    while True:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 403 and response.headers.get("X-RateLimit-Remaining") == "0":
-            reset_time = int(response.headers.get("X-RateLimit-Reset", 0))
-            sleep_seconds = max(reset_time - int(time.time()), 0) + 1
-            logging.warning(f"Rate limit exceeded. Sleeping for {sleep_seconds} seconds...")
-            time.sleep(sleep_seconds)
-            continue
-        break
-
-    if response.status_code == 200:
-        data = response.json()
+    status, data = (client or GITHUB_CLIENT).get_issue(repo_name, issue_number)
+    if data is not None:
         return (
             data.get("created_at", ""),
             data.get("closed_at", ""),
@@ -270,150 +734,394 @@ def get_issue_details(repo_name: str, issue_number: int) -> Tuple[str, str, str]
         logging.warning(f"Failed to fetch issue {issue_number} from {repo_name}")
         return "", "", "Fetch failed"
 
-def get_issue_description(repo_name: str, issue_number: int) -> str:
+def get_issue_description(repo_name: str, issue_number: int, client: Optional[GitHubClient] = None) -> str:
     """
     Fetches the description of a GitHub issue.
 
     Args:
         repo_name (str): The GitHub repository name.
         issue_number (int): The issue number.
+        client (Optional[GitHubClient], optional): The API client. Defaults to GITHUB_CLIENT.
 
     Returns:
         str: The issue description, or "Fetch failed" if not found.
     """
-    url = f"https://api.github.com/repos/{repo_name}/issues/{issue_number}"
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "Authorization": f"token {GITHUB_TOKEN}"
-    }
-
-    while True:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 403 and response.headers.get("X-RateLimit-Remaining") == "0":
-            reset_time = int(response.headers.get("X-RateLimit-Reset", 0))
-            sleep_seconds = max(reset_time - int(time.time()), 0) + 1
-            logging.warning(f"Rate limit exceeded. Sleeping for {sleep_seconds} seconds...")
-            time.sleep(sleep_seconds)
-            continue
-        break
-
-    if response.status_code == 200:
-        data = response.json()
+    status, data = (client or GITHUB_CLIENT).get_issue(repo_name, issue_number)
+    if data is not None:
         return data.get("body", "No description")
     else:
         logging.warning(f"Failed to fetch issue {issue_number} from {repo_name}")
         return "Fetch failed"
 
-def update_dataframe(csv_filename: str) -> None:
+def listing_window(df: pd.DataFrame, rows: List, slack: pd.Timedelta = pd.Timedelta(days=1)) -> Dict[str, Optional[str]]:
     """
-    Updates the DataFrame with linked issues, PR dates, and issue details.
+    Computes the start of the crawl window of each repository, for listing prefetches.
+
+    A PR merged by a resolving commit was last updated no earlier than that
+    commit, so nothing older than the earliest resolving commit (minus `slack`
+    for clock skew) needs to be listed.
+
+    Args:
+        df (pd.DataFrame): The scraped rows.
+        rows (List): The index labels of the rows to cover.
+        slack (pd.Timedelta, optional): Margin before the earliest commit. Defaults to one day.
+
+    Returns:
+        Dict[str, Optional[str]]: ISO 8601 UTC start by repository, None where no date is known.
+    """
+    dates = pd.to_datetime(df.loc[rows, "resolving_commit_date"], utc=True, errors="coerce", format="ISO8601")
+    starts = (dates - slack).groupby(df.loc[rows, "repo_name"]).min()
+    return {repo_name: start.strftime("%Y-%m-%dT%H:%M:%SZ") if pd.notna(start) else None for repo_name, start in starts.items()}
+
+def enrich_dataframe(df: pd.DataFrame, client: Optional[GitHubClient] = None, backend: str = "rest",
+                     native_lists: bool = False, issue_cache: Optional[IssueCache] = None,
+                     prefetch: bool = False) -> pd.DataFrame:
+    """
+    Fills PR dates, linked issues and issue details for rows that still miss them.
+
+    Requests run concurrently through the client in three waves (PR dates, linked
+    issues, issue details), bounded by the client's in-flight limit. With the
+    "graphql" backend, PRs, their closing issues and the remaining linked issues
+    are first fetched in aliased GraphQL batches and seeded into the client, so
+    the waves only fall back to REST for what GraphQL could not return. With
+    `prefetch`, the closed PRs and issues of each repository's crawl window are
+    first paged in from the list endpoints (see `ListingPrefetcher`), 100 per
+    request, and only the objects missing from the listings are fetched singly.
+
+    Issue details go through a pre-pass: the unique (repo, issue) pairs of all
+    rows are looked up in the issue cache, each missing one is fetched exactly
+    once, and the per-row lists are then joined from the results.
 
     Args:
-        csv_filename (str): The CSV file containing commit data to update.
+        df (pd.DataFrame): The scraped rows, modified in place.
+        client (Optional[GitHubClient], optional): The API client. Defaults to GITHUB_CLIENT.
+        backend (str, optional): "rest" or "graphql". Defaults to "rest".
+        native_lists (bool, optional): Store list cells as lists instead of their `str(list)`
+            form, for typed Parquet output. Defaults to False.
+        issue_cache (Optional[IssueCache], optional): Issue details shared across calls. Defaults to ISSUE_CACHE.
+        prefetch (bool, optional): Prefetch PRs and issues from paginated listings. Defaults to False.
+
+    Returns:
+        pd.DataFrame: The same DataFrame.
+    """
+    client = client or GITHUB_CLIENT
+    enriched_cols = ["pr_open_date", "pr_close_date", "linked_issue_nums", "_linked_issue_desc",
+                     "linked_issue_date_open", "linked_issue_date_closed"]
+    df[enriched_cols] = df[enriched_cols].astype(object)
+
+    has_pr = df["pr_num"].notna()
+    date_rows = list(df.index[has_pr & df["pr_open_date"].isna()])
+    issue_rows = list(df.index[has_pr & df["_linked_issue_desc"].isna()])
+
+    pr_rows = list(dict.fromkeys(date_rows + issue_rows))
+    prefetcher = ListingPrefetcher(client) if prefetch else None
+    window = listing_window(df, pr_rows) if prefetcher is not None else {}
+    if prefetcher is not None:
+        prefetcher.prime_pulls(((df.at[i, "repo_name"], df.at[i, "pr_num"]) for i in pr_rows), window)
+    batcher = GraphQLBatcher(client) if backend == "graphql" else None
+    if batcher is not None:
+        batcher.prime_pulls((df.at[i, "repo_name"], df.at[i, "pr_num"]) for i in pr_rows)
+
+    # Process PR open/close dates
+    pr_dates = client.map(lambda i: get_pr_dates(df.at[i, "repo_name"], df.at[i, "pr_num"], client), date_rows)
+    for index, (pr_open_date, pr_close_date) in zip(date_rows, pr_dates):
+        df.at[index, "pr_open_date"] = pr_open_date
+        df.at[index, "pr_close_date"] = pr_close_date
+
+    # Process linked issues: fetch the PR bodies, then extract references from all of them in one pass
+    pulls = client.map(lambda i: client.get_pull(df.at[i, "repo_name"], df.at[i, "pr_num"])[1], issue_rows)
+    for index, pull in zip(issue_rows, pulls):
+        if pull is None:
+            logging.warning(f"Failed to fetch PR {df.at[index, 'pr_num']} from {df.at[index, 'repo_name']}")
+    linked = closing_issues_batch([pull.get("body", "") if pull is not None else None for pull in pulls],
+                                  [df.at[index, "repo_name"] for index in issue_rows])
+    issue_cache = issue_cache if issue_cache is not None else ISSUE_CACHE
+    references = [(df.at[index, "repo_name"], int(issue_number))
+                  for index, linked_issues in zip(issue_rows, linked) for issue_number in linked_issues]
+    details, missing = {}, []
+    for pair in dict.fromkeys(references):
+        cached = issue_cache.get(*pair)
+        if cached is not None:
+            details[pair] = cached
+        else:
+            missing.append(pair)
+    if prefetcher is not None:
+        prefetcher.prime_issues(missing, window)
+        logging.info(f"Listing prefetch: {prefetcher.pages} pages, {prefetcher.seeded} objects seeded")
+    if batcher is not None:
+        batcher.prime_issues(missing)
+        logging.info(f"GraphQL: {batcher.queries} queries, {batcher.total_cost} rate-limit points")
+    for pair, fetched in zip(missing, client.map(lambda pair: get_issue_details(*pair, client), missing)):
+        details[pair] = fetched
+        if fetched != ("", "", "Fetch failed"):
+            issue_cache.put(*pair, fetched)
+    logging.info(f"Issue details: {len(references)} references to {len(details)} issues, {len(missing)} fetched; "
+                 f"cache {issue_cache.stats()}")
+
+    for index, linked_issues in zip(issue_rows, linked):
+        issue_descriptions = []
+        issue_open_dates = []
+        issue_close_dates = []
+
+        for issue_number in linked_issues:
+            issue_open, issue_close, issue_desc = details[(df.at[index, "repo_name"], int(issue_number))]
+            issue_descriptions.append(f"Issue #{issue_number}: {issue_desc}")
+            issue_open_dates.append(issue_open)
+            issue_close_dates.append(issue_close)
+
+        # Store extracted data
+        as_cell = list if native_lists else str
+        df.at[index, "linked_issue_nums"] = as_cell(linked_issues)  # List of issue numbers
+        df.at[index, "_linked_issue_desc"] = " | ".join(issue_descriptions)
+        df.at[index, "linked_issue_date_open"] = as_cell(issue_open_dates)
+        df.at[index, "linked_issue_date_closed"] = as_cell(issue_close_dates)
+
+    logging.info(f"GitHub resources: {client.fetched} fetched, {client.coalesced} served from shared fetches")
+    if client.cache is not None:
+        logging.info(f"GitHub response cache: {client.cache.stats()}")
+    return df
+
+def update_dataframe(csv_filename: str, client: Optional[GitHubClient] = None, backend: str = "rest",
+                     chunk_size: Optional[int] = None, sink: Optional[PartitionedSink] = None,
+                     prefetch: bool = False) -> None:
     """
-    df = pd.read_csv(csv_filename)
+    Updates the DataFrame with linked issues, PR dates, and issue details.
 
-    for index, row in df.iterrows():
-        pr_number = row["pr_num"]
-        repo_name = row["repo_name"]
+    By default the whole file is loaded, enriched and written back. With a
+    `chunk_size` (or a `sink`) rows are enriched in chunks instead, see
+    `enrich_in_chunks`, so memory is bounded by the chunk size and a crash
+    only loses the chunk in progress. Parquet output of `process_repo`, a
+    directory of parts, is always enriched in chunks.
 
-        # Process PR open/close dates
-        if pd.notna(pr_number) and pd.isna(row["pr_open_date"]):
-            pr_open_date, pr_close_date = get_pr_dates(repo_name, pr_number)
-            df.at[index, "pr_open_date"] = pr_open_date
-            df.at[index, "pr_close_date"] = pr_close_date
+    Args:
+        csv_filename (str): The CSV file containing commit data to update. A `.parquet` file or
+            directory is read and rewritten with the typed ROW_SCHEMA instead.
+        client (Optional[GitHubClient], optional): The API client. Defaults to GITHUB_CLIENT.
+        backend (str, optional): "rest" or "graphql", see `enrich_dataframe`. Defaults to "rest".
+        chunk_size (Optional[int], optional): Rows per chunk. Defaults to None (no chunking).
+        sink (Optional[PartitionedSink], optional): Write the enriched chunks to this dataset
+            and leave `csv_filename` untouched. Defaults to None.
+        prefetch (bool, optional): Page closed PRs and issues in from the list endpoints first,
+            see `enrich_dataframe`. Defaults to False.
+    """
+    if chunk_size is not None or sink is not None or os.path.isdir(csv_filename):
+        enrich_in_chunks(csv_filename, sink, chunk_size or 1000, client, backend, prefetch)
+    elif csv_filename.endswith(".parquet"):
+        df = enrich_dataframe(read_dataframe(csv_filename), client, backend, native_lists=True, prefetch=prefetch)
+        write_parquet(to_table(df, ROW_SCHEMA), csv_filename)
+    else:
+        df = pd.read_csv(csv_filename)
+        enrich_dataframe(df, client, backend, prefetch=prefetch)
+        df.to_csv(csv_filename, index=False)
+    print(f"Updated issue and PR data saved in {sink.path if sink is not None else csv_filename}")
+
+def iter_row_chunks(filename: str, chunk_size: int, skip: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    Reads scraper rows from a CSV or Parquet file (or directory of Parquet parts) in chunks.
 
-        # Process linked issues
-        if pd.notna(pr_number) and pd.isna(row["_linked_issue_desc"]):
-            linked_issues = get_linked_issues(repo_name, pr_number)
+    Args:
+        filename (str): The input file.
+        chunk_size (int): Rows per chunk.
+        skip (int, optional): Number of leading rows to skip. Defaults to 0.
 
-            issue_descriptions = []
-            issue_open_dates = []
-            issue_close_dates = []
+    Yields:
+        pd.DataFrame: The chunks, indexed by row position in the file.
+    """
+    if filename.endswith(".parquet"):
+        parts = PartitionedSink(filename).parts() if os.path.isdir(filename) else [filename]
+        batches = (batch for part in parts for batch in pq.ParquetFile(part).iter_batches(batch_size=chunk_size))
+        position = 0
+        for batch in batches:
+            start, position = position, position + batch.num_rows
+            if position <= skip:
+                continue
+            batch = batch.slice(max(skip - start, 0))
+            chunk = pa.Table.from_batches([batch]).to_pandas()
+            chunk.index = range(position - len(chunk), position)
+            yield chunk
+    else:
+        for chunk in pd.read_csv(filename, chunksize=chunk_size, skiprows=range(1, skip + 1)):
+            chunk.index = chunk.index + skip
+            yield chunk
 
-            for issue_number in linked_issues:
-                issue_open, issue_close, issue_desc = get_issue_details(repo_name, issue_number)
-                issue_descriptions.append(f"Issue #{issue_number}: {issue_desc}")
-                issue_open_dates.append(issue_open)
-                issue_close_dates.append(issue_close)
+def enrich_in_chunks(filename: str, sink: Optional[PartitionedSink] = None, chunk_size: int = 1000,
+                     client: Optional[GitHubClient] = None, backend: str = "rest", prefetch: bool = False) -> None:
+    """
+    Enriches rows chunk by chunk, flushing every enriched chunk to a sink right away.
 
-            # Store extracted data
-            df.at[index, "linked_issue_nums"] = str(linked_issues)  # List of issue numbers
-            df.at[index, "_linked_issue_desc"] = " | ".join(issue_descriptions)
-            df.at[index, "linked_issue_date_open"] = str(issue_open_dates)
-            df.at[index, "linked_issue_date_closed"] = str(issue_close_dates)
+    Each chunk is enriched with the usual concurrent waves of `enrich_dataframe`
+    and appended to the sink as a new part before the next chunk is read. A rerun
+    skips as many input rows as the sink already holds, so it resumes after the
+    last flushed chunk. Without a sink the chunks go to `<filename>.partial/`,
+    which is streamed back over `filename` once every chunk is done (or, for a
+    directory of parts, takes its place).
 
-    df.to_csv(csv_filename, index=False)
-    print(f"Updated issue and PR data saved in {csv_filename}")
+    Args:
+        filename (str): The CSV or typed Parquet file (or directory of parts) with scraped rows.
+        sink (Optional[PartitionedSink], optional): Where enriched chunks go. Defaults to None.
+        chunk_size (int, optional): Rows per chunk. Defaults to 1000.
+        client (Optional[GitHubClient], optional): The API client. Defaults to GITHUB_CLIENT.
+        backend (str, optional): "rest" or "graphql", see `enrich_dataframe`. Defaults to "rest".
+        prefetch (bool, optional): Prefetch each chunk's PRs and issues from listings. Defaults to False.
+    """
+    typed = filename.endswith(".parquet")
+    in_place = sink is None
+    if in_place:
+        sink = PartitionedSink(f"{filename}.partial", "parquet" if typed else "csv", ROW_SCHEMA if typed else None)
+    done = sink.count()
+    if done:
+        logging.info(f"{sink.path} already holds {done} enriched rows, resuming after them")
+
+    for chunk in iter_row_chunks(filename, chunk_size, skip=done):
+        enrich_dataframe(chunk, client, backend, native_lists=typed, prefetch=prefetch)
+        sink.append(chunk)
+        logging.info(f"Enriched rows {chunk.index[0]}-{chunk.index[-1]} of {filename}")
+
+    if in_place and os.path.isdir(filename):
+        os.replace(filename, f"{filename}.old")
+        os.replace(sink.path, filename)
+        shutil.rmtree(f"{filename}.old")
+    elif in_place:
+        sink.export(filename)
+        shutil.rmtree(sink.path)
 
 def handle_remove_readonly(func, path, exc):
     os.chmod(path, stat.S_IWRITE)
     func(path)
 
-def process_repo(repo_name: str, issues_data: dict, csv_filename: str, base_path: str = "repos", start_date: Optional[str] = None) -> None:
+def parquet_output(filename: str) -> PartitionedSink:
+    """
+    Opens the Parquet output of `process_repo`: a directory of ROW_SCHEMA parts, one per repository.
+
+    Each repository is written as a new part, so a crawl costs time linear in its
+    rows. A single Parquet file left by an earlier run becomes the first part.
+
+    Args:
+        filename (str): The output path, ending in `.parquet`.
+
+    Returns:
+        PartitionedSink: The dataset.
+    """
+    if os.path.isfile(filename):
+        logging.info(f"Moving {filename} into a directory of parts")
+        os.replace(filename, f"{filename}.tmp")
+        os.makedirs(filename)
+        os.replace(f"{filename}.tmp", os.path.join(filename, "part-000000.parquet"))
+    return PartitionedSink(filename, "parquet", ROW_SCHEMA)
+
+def process_repo(repo_name: str, issues_data: dict, csv_filename: str, base_path: str = "repos", start_date: Optional[str] = None,
+                 single_pass: bool = True, clone_strategy: str = "full", mirror_store: Optional[MirrorStore] = None,
+                 state: Optional[CrawlState] = None, pull_refs: bool = False, shards: int = 1) -> None:
     """
     Processes the repository by cloning it if needed, retrieving merge commits, and saving data.
 
     Args:
         repo_name (str): The name of the repository to process.
         issues_data (dict): A dictionary containing issues data.
-        csv_filename (str): The name of the CSV file to save the processed data.
+        csv_filename (str): The name of the CSV file to save the processed data. A `.parquet` name
+            is a directory of typed ROW_SCHEMA parts instead, see `parquet_output`.
         base_path (str, optional): The base path for repositories. Defaults to "repos".
         start_date (Optional[str], optional): The start date for filtering merge commits. Defaults to None.
+        single_pass (bool, optional): Extract with one streamed `git log` and bulk diffs instead of
+            several git calls per merge commit. Defaults to True.
+        clone_strategy (str, optional): One of CLONE_STRATEGIES, see `clone_repo_if_needed`. Defaults to "full".
+        mirror_store (Optional[MirrorStore], optional): Scan a reusable mirror from this store (kept after
+            the scan) instead of a fresh clone that is deleted afterwards. Defaults to None.
+        state (Optional[CrawlState], optional): Only scan merges newer than the commit recorded by the
+            previous run, and record the new head once the rows are written. Defaults to None.
+        pull_refs (bool, optional): Identify PRs, squash merges included, from the `refs/pull/*` refs
+            instead of merge messages (single-pass scan only). Clones fetch them first; a mirror store
+            must be created with `pull_refs=True`. Defaults to False.
+        shards (int, optional): Split the single-pass scan into this many commit-range shards extracted
+            in parallel processes, see `iter_sharded_rows`; the rows are the same as with one. Defaults to 1.
     """
-    repo_path = clone_repo_if_needed(repo_name, base_path)
+    lease = mirror_store.acquire(repo_name) if mirror_store is not None else None
+    repo_path = lease.path if lease is not None else None
+    if mirror_store is None:
+        repo_path = clone_repo_if_needed(repo_name, base_path, clone_strategy, start_date)
     if not repo_path:
         return
-    
-    merge_commits = get_merge_commits(repo_path, start_date)
-    
-    with open(csv_filename, 'a', newline='') as f:
-        writer = csv.writer(f)
+
+    try:
+        if pull_refs and lease is None:
+            fetch_pull_refs(repo_path)
+        pr_index = PullRequestIndex.from_repo(repo_path) if pull_refs else None
+
+        head = get_head(repo_path) if state is not None else None
+        rev_range = get_scan_range(repo_path, state.last_commit(repo_name), head[0]) if head else None
+
+        if single_pass and shards > 1:
+            rows = iter_sharded_rows(repo_name, repo_path, shards, start_date, rev_range, pr_index)
+        elif single_pass:
+            rows = iter_repo_rows(repo_name, repo_path, start_date, rev_range=rev_range, pr_index=pr_index)
+        else:
+            rows = _iter_repo_rows_per_commit(repo_name, repo_path, start_date, rev_range)
+        if csv_filename.endswith(".parquet"):
+            rows = list(rows)
+            if rows:
+                parquet_output(csv_filename).append(pd.DataFrame(rows, columns=ROW_SCHEMA.names))
+        else:
+            with open(csv_filename, 'a', newline='') as f:
+                writer = csv.writer(f)
+
+                for row in rows:
+                    writer.writerow(row)  
+                    logging.info(f"Saved row: {row}")
+
+        if head:
+            state.record_repo(repo_name, *head)
+            state.save()
+    finally:
+        if GIT_POOL is not None:
+            GIT_POOL.close(repo_path)
+            logging.info(f"Git worker pool stats: {GIT_POOL.stats()}")
+
+        if lease is not None:
+            lease.release()
+        elif os.path.exists(repo_path):
+            shutil.rmtree(repo_path, onerror=handle_remove_readonly)
+            logging.info(f"Deleted cloned repo at {repo_path} to save space")
+
+
+def _iter_repo_rows_per_commit(repo_name: str, repo_path: str, start_date: Optional[str] = None,
+                               rev_range: Optional[str] = None) -> Iterator[list]:
+    merge_commits = get_merge_commits(repo_path, start_date, rev_range)
+
+    for i, (merge_commit, merge_date) in enumerate(merge_commits, 1):
+        logging.info(f"Processing {repo_name} {i}/{len(merge_commits)}: {merge_commit}")
         
-        for i, (merge_commit, merge_date) in enumerate(merge_commits, 1):
-            logging.info(f"Processing {repo_name} {i}/{len(merge_commits)}: {merge_commit}")
-            
-            parent_commits = get_parent_commits(repo_path, merge_commit)
-            if not parent_commits:
-                continue
-            
-            base_commit_dates = [get_commit_date(repo_path, commit) for commit in parent_commits]
-            resolving_commit_date = get_commit_date(repo_path, merge_commit)
-            issue_number = get_issues_from_pr(repo_path, merge_commit)
-            
-            if issue_number is None:
-                logging.warning(f"No issue number found for {repo_name} merge commit {merge_commit}")
-                continue
-            
-            #issue_open_date, issue_closed_date, issue_description = get_issue_dates_from_api(repo_name, issue_number)
-            changed_files = [get_changed_files(repo_path, commit, merge_commit) for commit in parent_commits]
-            num_changed_files = list(map(len, changed_files))
-            pr_description = get_pr_description(repo_path, merge_commit)
-            
-            row = [
-                repo_name, parent_commits, base_commit_dates,
-                merge_commit, resolving_commit_date,
-                issue_number, None, None,
-                #PR_closed_date, PR_open_date,
-                num_changed_files, changed_files,
-                None, None, pr_description, None, None
-            ]
-            
-            writer.writerow(row)  
-            logging.info(f"Saved row: {row}")
-   
-    if os.path.exists(repo_path):
-        shutil.rmtree(repo_path, onerror=handle_remove_readonly)
-        logging.info(f"Deleted cloned repo at {repo_path} to save space")
+        parent_commits = get_parent_commits(repo_path, merge_commit)
+        if not parent_commits:
+            continue
+        
+        base_commit_dates = [get_commit_date(repo_path, commit) for commit in parent_commits]
+        resolving_commit_date = get_commit_date(repo_path, merge_commit)
+        issue_number = get_issues_from_pr(repo_path, merge_commit)
+        
+        if issue_number is None:
+            logging.warning(f"No issue number found for {repo_name} merge commit {merge_commit}")
+            continue
+        
+        #issue_open_date, issue_closed_date, issue_description = get_issue_dates_from_api(repo_name, issue_number)
+        changed_files = [get_changed_files(repo_path, commit, merge_commit) for commit in parent_commits]
+        pr_description = get_pr_description(repo_path, merge_commit)
+        
+        yield build_row(
+            repo_name, parent_commits, base_commit_dates,
+            merge_commit, resolving_commit_date, issue_number,
+            changed_files, pr_description
+        )
 
 
 def initialize_csv(filename: str) -> None:
     """
-    Ensures the CSV file has headers if it doesn’t exist.
+    Ensures the CSV file has headers if it doesn’t exist. Parquet output carries its schema instead.
 
     Args:
         filename (str): The CSV file to check and initialize.
     """
+    if filename.endswith(".parquet"):
+        return
     if not os.path.exists(filename):
         with open(filename, 'w', newline='') as f:
             writer = csv.writer(f)
@@ -434,27 +1142,12 @@ def explode_base_commits(df: pd.DataFrame) -> pd.DataFrame:
     for col in list_cols:
         df[col] = df[col].apply(lambda x: ast.literal_eval(x) if isinstance(x, str) else x)
     
-    # Создаём список новых строк
-    rows = []
-    for _, row in df.iterrows():
-        base_commits = row['base_commit_ids']
-        base_dates = row['base_commit_dates']
-        num_files = row['num_changed_files']
-        files_list = row['changed_files_list']
-
-        for i in range(len(base_commits)):
-            new_row = row.copy()
-            new_row['base_commit'] = base_commits[i]
-            new_row['base_commit_date'] = base_dates[i] if i < len(base_dates) else None
-            new_row['num_changed_files'] = num_files[i] if i < len(num_files) else None
-            new_row['changed_files_list'] = files_list[i] if i < len(files_list) else None
-            rows.append(new_row)
-
-    # Создаём DataFrame и удаляем старые списочные колонки
-    exploded_df = pd.DataFrame(rows)
-    exploded_df = exploded_df.drop(columns=['base_commit_ids', 'base_commit_dates'])
-
-    return exploded_df
+    # Одна строка на базовый коммит, без цикла по строкам
+    exploded_df = explode_groups(df, list_cols)
+    exploded_df = exploded_df.rename(columns={'base_commit_ids': 'base_commit', 'base_commit_dates': 'base_commit_date'})
+    columns = [col for col in df.columns if col not in ('base_commit_ids', 'base_commit_dates')]
+
+    return exploded_df[columns + ['base_commit', 'base_commit_date']]
 
 
 def main() -> None:
@@ -0,0 +1,39 @@
+import subprocess
+
+import pandas as pd
+
+from patch_stage import materialize_patches
+
+
+def _git(repo, *args):
+    return subprocess.run(["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t"] + list(args),
+                          check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _commit(repo, files, message):
+    for name, content in files.items():
+        path = repo / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", message)
+    return _git(repo, "rev-parse", "HEAD")
+
+
+def test_testpaths_pointing_at_the_package_keep_sources_in_patch(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q")
+    before = _commit(repo, {"pytest.ini": "[pytest]\ntestpaths = mypkg\n", "mypkg/__init__.py": "",
+                            "mypkg/core.py": "x = 1\n", "mypkg/tests/test_core.py": "def test_x():\n    pass\n"},
+                     "init")
+    after = _commit(repo, {"mypkg/core.py": "x = 2\n",
+                           "mypkg/tests/test_core.py": "def test_x():\n    assert True\n"}, "fix")
+    df = pd.DataFrame({"repo_name": ["x/repo"], "base_commit": [before], "resolving_commit_id": [after]})
+
+    for use_testpaths in (False, True):
+        row = materialize_patches(df, repo_paths={"x/repo": str(repo)}, workers=2,
+                                  use_testpaths=use_testpaths).iloc[0]
+        assert "diff --git a/mypkg/core.py b/mypkg/core.py" in row["patch"]
+        assert "mypkg/core.py" not in row["test_patch"]
+        assert "diff --git a/mypkg/tests/test_core.py b/mypkg/tests/test_core.py" in row["test_patch"]